@@ -13,6 +13,9 @@ class Config:
         self.paths = data["paths"]
         self.retrieval = data["retrieval"]
         self.chunking = data["chunking"]
+        self.dedup = data["dedup"]
+        self.boilerplate = data["boilerplate"]
+        self.ingest = data["ingest"]
         self.embeddings = data["embeddings"]
         self.llm = data["llm"]
         self.prompt = data["prompt"]
@@ -54,62 +54,178 @@ def chunk_document_for_bm25(
     """
 
     chunks = []
-    chunk_id = 0
 
     for page in pages:
-        raw_text = page.get("text", "")
-        if not raw_text or len(raw_text.strip()) < min_chars:
-            continue
+        chunks.extend(chunk_page_for_bm25(
+            page, len(chunks), min_chars=min_chars, max_chars=max_chars))
 
-        sentences = split_into_sentences(raw_text)
-
-        buffer = ""
-        buffer_sent_ids = []
-
-        for sent_idx, sentence in enumerate(sentences):
-
-            if not sentence.strip():
-                continue
-
-            # Накопление коротких предложений
-            if len(sentence) < min_chars:
-                buffer += " " + sentence
-                buffer_sent_ids.append(sent_idx)
-                continue
-
-            # Если в буфере что-то есть — сначала сбрасываем его
-            if buffer:
-                cleaned = clean_text_for_bm25(buffer)
-                if len(cleaned) >= min_chars:
-                    chunks.append(_make_chunk(
-                        page, cleaned, chunk_id, buffer_sent_ids
-                    ))
-                    chunk_id += 1
-                buffer = ""
-                buffer_sent_ids = []
-
-            # Основное предложение
-            cleaned = clean_text_for_bm25(sentence)
-            if min_chars <= len(cleaned) <= max_chars:
-                chunks.append(_make_chunk(
-                    page, cleaned, chunk_id, [sent_idx]
-                ))
-                chunk_id += 1
+    logger.info(f"[BM25] created {len(chunks)} sentence-level chunks")
+    return chunks
+
+
+def chunk_page_for_bm25(
+    page: Dict,
+    chunk_id: int = 0,
+    min_chars: int = 40,
+    max_chars: int = 500,
+) -> List[Dict]:
+    """
+    Чанки одной страницы; нумерация продолжается с chunk_id.
+    Те же, что строит document.chunk_page
+    """
+
+    if page.get("table_header") is not None:
+        header, rows = table_rows(page)
+        return chunk_rows_for_bm25(page, [header, *rows], chunk_id, max_chars=max_chars)
+
+    raw_text = page.get("text", "")
+    if not raw_text or len(raw_text.strip()) < min_chars:
+        return []
+
+    return pack_sentences_for_bm25(
+        page, page_sentences(split_raw_paragraphs(raw_text)),
+        chunk_id, min_chars=min_chars, max_chars=max_chars)
+
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def split_raw_paragraphs(text: str) -> List[str]:
+    """
+    Абзацы страницы без очистки (по пустым строкам)
+    """
+    return _PARAGRAPH_RE.split(text)
+
+
+def page_sentences(paragraphs: List[str]) -> List[str]:
+    """
+    Предложения по абзацам: предложение не переходит через пустую строку
+    """
+    return [s for p in paragraphs for s in split_into_sentences(p)]
+
+
+def pack_sentences_for_bm25(
+    page: Dict,
+    sentences: List[str],
+    chunk_id: int = 0,
+    min_chars: int = 40,
+    max_chars: int = 500,
+) -> List[Dict]:
+    """
+    Sentence-level чанки: короткие предложения копятся в буфере, длинные
+    (до max_chars) идут отдельным чанком. sentence_ids - номера в sentences
+    """
+
+    chunks = []
+
+    buffer = []
+    buffer_sent_ids = []
 
-        # Хвост
+    for sent_idx, sentence in enumerate(sentences):
+
+        # Накопление коротких предложений
+        if len(sentence) < min_chars:
+            buffer.append(sentence)
+            buffer_sent_ids.append(sent_idx)
+            continue
+
+        # Если в буфере что-то есть — сначала сбрасываем его
         if buffer:
-            cleaned = clean_text_for_bm25(buffer)
+            cleaned = clean_text_for_bm25(" ".join(buffer))
             if len(cleaned) >= min_chars:
-                chunks.append(_make_chunk(
+                chunks.append(make_bm25_chunk(
                     page, cleaned, chunk_id, buffer_sent_ids
                 ))
                 chunk_id += 1
+            buffer = []
+            buffer_sent_ids = []
+
+        # Основное предложение
+        cleaned = clean_text_for_bm25(sentence)
+        if min_chars <= len(cleaned) <= max_chars:
+            chunks.append(make_bm25_chunk(
+                page, cleaned, chunk_id, [sent_idx]
+            ))
+            chunk_id += 1
+
+    # Хвост
+    if buffer:
+        cleaned = clean_text_for_bm25(" ".join(buffer))
+        if len(cleaned) >= min_chars:
+            chunks.append(make_bm25_chunk(
+                page, cleaned, chunk_id, buffer_sent_ids
+            ))
+
+    return chunks
+
+
+def table_rows(page: Dict) -> tuple[str, List[str]]:
+    """
+    (заголовок, строки) блока таблицы: первая строка текста - заголовок
+    (page["table_header"]), дальше по строке таблицы на строку текста
+    """
+    lines = (page.get("text") or "").split("\n")[1:]
+    return page["table_header"], [line for line in lines if line.strip()]
+
+
+def _split_words(text: str, max_chars: int) -> List[str]:
+    """
+    Куски по границам слов, не длиннее max_chars
+    """
+    pieces, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_rows_for_bm25(
+    page: Dict,
+    rows: List[str],
+    chunk_id: int = 0,
+    max_chars: int = 500,
+) -> List[Dict]:
+    """
+    Чанки таблицы (Excel, DOCX): строки подряд, до max_chars после очистки.
+    В строках нет знаков конца предложения, так что split_into_sentences
+    сделал бы из блока одно слишком длинное "предложение"; длинная строка
+    режется по словам. sentence_ids - номера строк
+    """
+
+    chunks = []
+    buffer, buffer_ids, size = [], [], 0
+
+    for row_idx, row in enumerate(rows):
+        cleaned = clean_text_for_bm25(row)
+        if not cleaned:
+            continue
+
+        for piece in _split_words(cleaned, max_chars):
+            if buffer and size + 1 + len(piece) > max_chars:
+                chunks.append(make_bm25_chunk(
+                    page, " ".join(buffer), chunk_id, buffer_ids
+                ))
+                chunk_id += 1
+                buffer, buffer_ids, size = [], [], 0
+
+            buffer.append(piece)
+            if not buffer_ids or buffer_ids[-1] != row_idx:
+                buffer_ids.append(row_idx)
+            size += len(piece) + 1
+
+    if buffer:
+        chunks.append(make_bm25_chunk(
+            page, " ".join(buffer), chunk_id, buffer_ids
+        ))
 
-    logger.info(f"[BM25] created {len(chunks)} sentence-level chunks")
     return chunks
 
 
-def _make_chunk(page, text, chunk_id, sent_ids):
+def make_bm25_chunk(page, text, chunk_id, sent_ids):
     """
     Унифицированная структура чанка
     """
@@ -0,0 +1,106 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Iterable, Iterator
+
+from loguru import logger
+
+
+_DIGITS_RE = re.compile(r"\d+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def line_key(line: str) -> bytes:
+    """
+    Hash of a line with digits and spacing normalized, so "Стр. 12 из 300"
+    and "Стр. 13 из 300" or a revision stamp with changing dates count as
+    the same line.
+    """
+    norm = _DIGITS_RE.sub("#", line.lower())
+    norm = _SPACES_RE.sub(" ", norm).strip()
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest()
+
+
+def strip_boilerplate(
+    pages: Iterable[Dict],
+    warmup_pages: int = 20,
+    min_share: float = 0.5,
+    min_pages: int = 3,
+    edge_lines: int = 3,
+) -> Iterator[Dict]:
+    """
+    Remove running headers, footers, page numbers and stamps from a stream
+    of PDF pages before chunking.
+
+    Only the first and last `edge_lines` non-empty lines of a page are
+    candidates, and only as many as leave at least one body line between
+    them: on a short page the edges shrink (a page of one or two lines has
+    none), so repeated body lines of short pages ("Таблица 3", numbered
+    rows) are not mistaken for headers and no page is stripped empty.
+
+    A candidate is boilerplate when its key (see line_key) was seen on at
+    least `min_share` of the pages so far, and on `min_pages` pages at least.
+    The first `warmup_pages` pages are held back until their counts are
+    known; after that pages pass through one at a time and keep updating
+    the counts. Only 8-byte line hashes are kept, not lines.
+
+    Pages of other file types (DOCX sections, Excel blocks with a repeated
+    header row) are passed through unchanged.
+    """
+    counts = Counter()
+    seen = 0
+    stripped = 0
+    held = []
+    path = None
+
+    def edges(lines: list) -> set:
+        idx = [i for i, line in enumerate(lines) if line.strip()]
+        k = min(edge_lines, (len(idx) - 1) // 2)
+        if k <= 0:
+            return set()
+        return set(idx[:k] + idx[-k:])
+
+    def count(page: Dict):
+        nonlocal seen
+        lines = page["text"].split("\n")
+        seen += 1
+        counts.update({line_key(lines[i]) for i in edges(lines)})
+
+    def strip(page: Dict) -> Dict:
+        nonlocal stripped
+        threshold = max(min_pages, min_share * seen)
+        lines = page["text"].split("\n")
+
+        drop = {i for i in edges(lines) if counts[line_key(lines[i])] >= threshold}
+        if not drop:
+            return page
+
+        stripped += len(drop)
+        text = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+        return dict(page, text=text)
+
+    for page in pages:
+        if page.get("file_type") != "pdf":
+            yield page
+            continue
+
+        path = page.get("path")
+        count(page)
+
+        if seen <= warmup_pages:
+            held.append(page)
+            if seen < warmup_pages:
+                continue
+            for p in held:
+                yield strip(p)
+            held = []
+            continue
+
+        yield strip(page)
+
+    # short document: fewer pages than the warmup window
+    for p in held:
+        yield strip(p)
+
+    if stripped:
+        logger.info(f"Stripped {stripped} boilerplate lines from {seen} pages: {path}")
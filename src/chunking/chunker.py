@@ -429,39 +429,30 @@ def filter_content_pages(pages: List[Dict]) -> List[Dict]:
 #             min_words=min_words,
 #             max_words=max_words
 #         )
+def make_page_chunks(page, chunks):
+    return [{
+        "text": chunk,
+        "chunk_id": idx,
+        "page": page.get("page"),
+        "path": page.get("path"),
+        "file_type": page.get("file_type"),
+        "sheet": page.get("sheet"),
+        "section": page.get("section"),
+        "type": page.get("page_type"),
+    } for idx, chunk in enumerate(chunks)]
+
+
 def chunk_document(pages):
+    # Ingest uses src.chunking.document.chunk_page, which builds both
+    # granularities in one pass; this one is kept for the debug scripts
     faiss_chunks = []
     bm25_chunks = []
 
     for page in pages:
         paragraphs = split_and_clean_paragraphs(page["text"])
 
-        faiss = build_faiss_chunks(paragraphs)
-        bm25  = build_bm25_chunks(paragraphs)
-
-    for idx, chunk in enumerate(faiss):
-        faiss_chunks.append({
-                "text": chunk,
-                "chunk_id": idx,
-                "page": page.get("page"),
-                "path": page.get("path"),
-                "file_type": page.get("file_type"),
-                "sheet": page.get("sheet"),
-                "section": page.get("section"),
-                "type": page.get("page_type"),
-            })
-    
-    for idx, chunk in enumerate(bm25):
-        bm25_chunks.append({
-                "text": chunk,
-                "chunk_id": idx,
-                "page": page.get("page"),
-                "path": page.get("path"),
-                "file_type": page.get("file_type"),
-                "sheet": page.get("sheet"),
-                "section": page.get("section"),
-                "type": page.get("page_type"),
-            })
+        faiss_chunks.extend(make_page_chunks(page, build_faiss_chunks(paragraphs)))
+        bm25_chunks.extend(make_page_chunks(page, build_bm25_chunks(paragraphs)))
 
     logger.info(f"Chunking finished: {len(faiss_chunks)} chunks")
     logger.info(f"Chunking finished: {len(bm25_chunks)} chunks")
@@ -492,6 +483,27 @@ def build_faiss_chunks(paragraphs, min_words=200, max_words=800):
     return chunks
 
 
+def build_table_chunks(header, rows, max_words=800):
+    """Table rows (one line each) packed under a copy of the header row, up to max_words per chunk"""
+    chunks = []
+    current, cur_len = [], len(header.split())
+
+    for row in rows:
+        w = len(row.split())
+
+        if current and cur_len + w > max_words:
+            chunks.append("\n".join([header, *current]))
+            current, cur_len = [], len(header.split())
+
+        current.append(row)
+        cur_len += w
+
+    if current or not chunks:
+        chunks.append("\n".join([header, *current]))
+
+    return chunks
+
+
 def build_bm25_chunks(paragraphs, min_len=150, max_len=300):
     chunks = []
 
@@ -0,0 +1,301 @@
+import hashlib
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+from loguru import logger
+
+
+# Largest prime below 2**32: permuted hashes fit in uint32
+_PRIME = np.uint64(4294967291)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class MinHashDeduper:
+    """
+    Near-duplicate detector for chunks (MinHash + LSH banding).
+
+    Each text becomes a set of word shingles; its MinHash signature has
+    `num_perm` values, split into `bands` bands. Texts sharing at least one
+    band are candidates, and a candidate is accepted as a duplicate when the
+    estimated Jaccard similarity (share of equal signature values) reaches
+    `threshold`.
+
+    The first chunk seen is the canonical one; `find_or_add` returns it for
+    every later near-duplicate, so the caller can drop the duplicate and
+    record its location on the canonical chunk. Chunks indexed by earlier
+    runs are put in with `add` (see seed_deduper). The deduper only reads
+    and returns the items, it never writes to the stores. Items are dicts
+    with a "doc_id"; `discard` drops the canonical chunks of documents that
+    are re-indexed, removed or not indexed after all.
+
+    Signatures are remembered by a digest of the text; save_signatures /
+    load_signatures keep them between runs, so seeding the index with the
+    stored chunks does not hash the whole corpus again.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        threshold: float = 0.85,
+        shingle_size: int = 3,
+        seed: int = 42,
+    ):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**31, size=num_perm, dtype=np.uint64)
+
+        self.seed = seed
+
+        # discarded entries leave None in the lists, so indices stay valid
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray | None] = []
+        self._digests: List[bytes | None] = []
+        self._items: List[dict | None] = []
+        self._by_doc: Dict[str, List[int]] = {}
+
+        # text digest -> signature, from the previous runs
+        self._known: Dict[bytes, np.ndarray] = {}
+
+        self.checked = 0
+        self.duplicates = 0
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        k = self.shingle_size
+
+        if len(words) <= k:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+
+        return np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) for g in set(grams)),
+            dtype=np.uint64,
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        x = self._shingles(text)
+        # (a * x + b) mod p for every permutation at once: (n_shingles, num_perm)
+        hashed = (np.outer(x, self._a) + self._b) % _PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _lookup(self, text: str) -> tuple[bytes, np.ndarray, list]:
+        """(text digest, signature, band keys)"""
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        sig = self._known.get(digest)
+        if sig is None:
+            sig = self.signature(text)
+
+        return digest, sig, self._band_keys(sig)
+
+    def _band_keys(self, sig: np.ndarray) -> list:
+        return [
+            sig[i * self.rows:(i + 1) * self.rows].tobytes()
+            for i in range(self.bands)
+        ]
+
+    def _insert(self, digest: bytes, sig: np.ndarray, band_keys: list, item: dict):
+        idx = len(self._items)
+        self._items.append(item)
+        self._signatures.append(sig)
+        self._digests.append(digest)
+        self._by_doc.setdefault(item["doc_id"], []).append(idx)
+
+        for band, key in zip(self._buckets, band_keys):
+            band.setdefault(key, []).append(idx)
+
+    def discard(self, doc_ids: Iterable) -> int:
+        """
+        Drop the canonical chunks of these documents: later texts are not
+        matched against them, save_signatures leaves them out.
+
+        :return: Number of chunks dropped
+        """
+        n = 0
+        for doc_id in doc_ids:
+            for idx in self._by_doc.pop(doc_id, ()):
+                for band, key in zip(self._buckets, self._band_keys(self._signatures[idx])):
+                    bucket = band[key]
+                    bucket.remove(idx)
+                    if not bucket:
+                        del band[key]
+                self._items[idx] = self._signatures[idx] = self._digests[idx] = None
+                n += 1
+        return n
+
+    def add(self, text: str, item: dict):
+        """Make `item` canonical without looking for duplicates (an already indexed chunk)"""
+        self._insert(*self._lookup(text), item)
+
+    def find_or_add(self, text: str, item: dict):
+        """
+        :return: The canonical item if `text` is a near-duplicate of one seen
+                 before, otherwise None (and `item` becomes canonical)
+        """
+        self.checked += 1
+        digest, sig, band_keys = self._lookup(text)
+
+        seen = set()
+        for band, key in zip(self._buckets, band_keys):
+            for idx in band.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+
+                similarity = np.mean(self._signatures[idx] == sig)
+                if similarity >= self.threshold:
+                    self.duplicates += 1
+                    return self._items[idx]
+
+        self._insert(digest, sig, band_keys, item)
+        return None
+
+    def _params(self) -> np.ndarray:
+        return np.array([self.num_perm, self.shingle_size, self.seed], dtype=np.int64)
+
+    def save_signatures(self, path: str):
+        """Signatures of the canonical texts, for load_signatures in the next run"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        live = [i for i, d in enumerate(self._digests) if d is not None]
+        digests = np.frombuffer(b"".join(self._digests[i] for i in live), dtype=np.uint64)
+        signatures = (
+            np.stack([self._signatures[i] for i in live]) if live
+            else np.zeros((0, self.num_perm), dtype=np.uint32))
+
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, params=self._params(), digests=digests, signatures=signatures)
+        os.replace(tmp, path)
+
+    def load_signatures(self, path: str):
+        path = Path(path)
+        if not path.exists():
+            return
+
+        with np.load(path) as data:
+            if not np.array_equal(data["params"], self._params()):
+                logger.info("[DEDUP] Stored signatures are for other settings, not used")
+                return
+            digests, signatures = data["digests"], data["signatures"]
+
+        self._known = dict(zip((d.tobytes() for d in digests), signatures))
+
+    def log_stats(self, name: str):
+        if self.checked:
+            logger.info(
+                f"[DEDUP] {name}: {self.duplicates} / {self.checked} chunks "
+                f"were near-duplicates ({self.duplicates / self.checked:.1%})")
+
+
+def seed_deduper(
+    deduper: MinHashDeduper, chunks, kind: str, skip_docs: Iterable = (), docs: Iterable | None = None,
+) -> int:
+    """
+    Put the stored chunks of `kind` (ChunkStore or SqliteChunks) into the
+    deduper as canonical, so new documents are deduplicated against what
+    earlier runs indexed. The record holds the stored chunk id, locations
+    found later are added with add_location.
+
+    :param skip_docs: Documents that are about to be re-indexed or removed
+    :param docs: Only the chunks of these documents (default: all)
+    :return: Number of chunks added
+    """
+    n = 0
+    for i, text, meta in chunks.iter_kind(kind, skip_docs, docs):
+        deduper.add(text, {"doc_id": meta.get("doc_id"), "id": i})
+        n += 1
+    return n
+
+
+def forget_locations(chunks, doc_ids: set, canonical_docs: Iterable | None = None) -> int:
+    """
+    Remove locations in `doc_ids` from the "duplicates" lists of stored
+    chunks (ChunkStore or SqliteChunks), when those documents are
+    re-indexed or removed.
+
+    :param canonical_docs: Documents that can hold such locations (the
+                           depends_on of `doc_ids`), default: all
+    :return: Number of locations removed
+    """
+    n = 0
+    for i in chunks.ids_with_duplicates(canonical_docs):
+        meta = chunks.metadata(i)
+        duplicates = meta["duplicates"]
+        left = [d for d in duplicates if d["doc_id"] not in doc_ids]
+        if len(left) != len(duplicates):
+            n += len(duplicates) - len(left)
+            # in place: a chunk indexed in this run shares it with its dedup record
+            duplicates[:] = left
+            chunks.set_metadata(i, meta)
+    return n
+
+
+def chunk_location(chunk: dict, doc_id: str) -> dict:
+    return {
+        "doc_id": doc_id,
+        "path": chunk.get("path"),
+        "page": chunk.get("page"),
+        "chunk_id": chunk.get("chunk_id"),
+    }
+
+
+def dedup_chunks(chunks: list, doc_id: str, deduper: MinHashDeduper) -> tuple[list, set, list]:
+    """
+    Drop near-duplicate chunks. Nothing is written to the stores: the
+    location of each dropped chunk is returned with the record of its
+    canonical chunk, for add_location once the document is indexed.
+
+    A kept chunk gets its record as chunk["dedup"]; its "duplicates" list
+    is the chunk's own, "id" is set when the chunk is indexed.
+
+    :return: (kept chunks, doc_ids of canonical chunks from other documents,
+              [(canonical record, location)])
+    """
+    kept = []
+    depends_on = set()
+    locations = []
+
+    for chunk in chunks:
+        # Only the small record is kept by the deduper, not the chunk text
+        record = {"doc_id": doc_id, "id": None, "duplicates": chunk.setdefault("duplicates", [])}
+        canonical = deduper.find_or_add(chunk["text"], record)
+
+        if canonical is None:
+            chunk["dedup"] = record
+            kept.append(chunk)
+            continue
+
+        locations.append((canonical, chunk_location(chunk, doc_id)))
+        if canonical["doc_id"] != doc_id:
+            depends_on.add(canonical["doc_id"])
+
+    return kept, depends_on, locations
+
+
+def add_location(chunks, record: dict, location: dict):
+    """
+    Record a dropped duplicate on its canonical chunk (dedup_chunks record).
+
+    :param chunks: Store of the canonical chunk (ChunkStore or SqliteChunks)
+    """
+    if record["id"] is None:
+        # canonical chunk not indexed yet: the location goes in with it
+        record["duplicates"].append(location)
+    else:
+        chunks.add_location(record["id"], location)
@@ -0,0 +1,153 @@
+from typing import Dict, Iterable, List
+
+from config.config import Config
+from src.chunking.chunker import build_faiss_chunks, build_table_chunks, clean_paragraph, make_page_chunks
+from src.chunking.bm25_chanking import (
+    chunk_page_for_bm25, pack_sentences_for_bm25, page_sentences, split_raw_paragraphs, table_rows)
+from src.chunking.boilerplate import strip_boilerplate
+from src.chunking.token_chunker import TokenChunker, get_tokenizer
+
+
+config = Config()
+
+
+def build_dense_chunks(paragraphs: List[str]) -> List[str]:
+    """
+    Pack cleaned paragraphs into FAISS chunks: by the embedding model's
+    token window (chunking.sizing = tokens) or by word count (= words).
+    """
+    if config.chunking["sizing"] != "tokens":
+        return build_faiss_chunks(paragraphs)
+
+    chunker = TokenChunker(
+        get_tokenizer(config.embeddings["model"]),
+        max_tokens=config.chunking["max_tokens"],
+        overlap_tokens=config.chunking["overlap_tokens"])
+    return chunker.chunk(paragraphs)
+
+
+def build_dense_table_chunks(header: str, rows: List[str]) -> List[str]:
+    """FAISS chunks of table rows, each starting with the header row (sizing as in build_dense_chunks)"""
+    if config.chunking["sizing"] != "tokens":
+        return build_table_chunks(header, rows)
+
+    chunker = TokenChunker(
+        get_tokenizer(config.embeddings["model"]),
+        max_tokens=config.chunking["max_tokens"],
+        overlap_tokens=config.chunking["overlap_tokens"])
+    return chunker.chunk_table(header, rows)
+
+
+def chunk_table_page(page: Dict, bm25_chunk_id: int = 0, max_chars: int = 500) -> tuple[list, list]:
+    """
+    FAISS and BM25 chunks of a block of table rows (page["table_header"]
+    set by the parser): the header row, then one line per row.
+
+    The prose path would lose most of it: rows have no sentence
+    punctuation, so a block is one over-long BM25 "sentence", and
+    clean_paragraph rejects digit-heavy text or repeated characters. Rows
+    are packed directly instead, the header is repeated in every FAISS
+    chunk and indexed once per block for BM25.
+
+    :return: (faiss_chunks, bm25_chunks)
+    """
+    header, rows = table_rows(page)
+
+    bm25 = chunk_page_for_bm25(page, bm25_chunk_id, max_chars=max_chars)
+    return make_page_chunks(page, build_dense_table_chunks(header, rows)), bm25
+
+
+def chunk_page(page: Dict, bm25_chunk_id: int = 0, min_chars: int = 40, max_chars: int = 500) -> tuple[list, list]:
+    """
+    FAISS and BM25 chunks of one page in a single pass over its text.
+
+    The page is split into paragraphs once; each paragraph is cleaned for
+    the FAISS chunks (clean_paragraph + build_dense_chunks) and split into
+    sentences once for the BM25 chunks (pack_sentences_for_bm25, the same
+    packing as chunk_page_for_bm25, so both give identical chunks).
+    Sentences do not cross paragraph breaks; sentence ids run over the
+    whole page. Blocks of table rows go to chunk_table_page.
+
+    :param bm25_chunk_id: First BM25 chunk_id (they are numbered per document)
+    :return: (faiss_chunks, bm25_chunks)
+    """
+    if page.get("table_header") is not None:
+        return chunk_table_page(page, bm25_chunk_id, max_chars=max_chars)
+
+    text = page.get("text") or ""
+
+    raw = split_raw_paragraphs(text)
+    paragraphs = [p for p in map(clean_paragraph, raw) if p]
+
+    bm25 = []
+    if len(text.strip()) >= min_chars:
+        bm25 = pack_sentences_for_bm25(
+            page, page_sentences(raw), bm25_chunk_id, min_chars=min_chars, max_chars=max_chars)
+
+    return make_page_chunks(page, build_dense_chunks(paragraphs)), bm25
+
+
+def chunk_pages(pages: Iterable[Dict]) -> Dict:
+    """
+    Chunk a stream of parsed pages (iter_document) one page at a time.
+
+    Running headers/footers are stripped first (strip_boilerplate, holds
+    back only its warmup window). Only content pages are chunked (see
+    filter_content_pages). A page is dropped as soon as its chunks are
+    built, so memory holds a few pages plus the chunks, never the parsed
+    document. The chunks of all pages are collected in the result, so that
+    part still grows with the document.
+
+    :return: {"pages": parsed pages, "content_pages": chunked pages,
+              "faiss_chunks": [...], "bm25_chunks": [...], "complete": False
+              if the parser hit an error (iter_document returned False)}
+    """
+    result = {"pages": 0, "content_pages": 0, "faiss_chunks": [], "bm25_chunks": [], "complete": True}
+
+    def parsed(pages):
+        # the generator's return value does not survive strip_boilerplate
+        result["complete"] = (yield from pages) is not False
+
+    pages = parsed(pages)
+
+    bp = config.boilerplate
+    if bp["enabled"]:
+        pages = strip_boilerplate(
+            pages,
+            warmup_pages=bp["warmup_pages"],
+            min_share=bp["min_share"],
+            min_pages=bp["min_pages"],
+            edge_lines=bp["edge_lines"])
+
+    for page in pages:
+        result["pages"] += 1
+        if page.get("page_type") != "content":
+            continue
+        result["content_pages"] += 1
+
+        faiss, bm25 = chunk_page(page, len(result["bm25_chunks"]))
+        result["faiss_chunks"].extend(faiss)
+        result["bm25_chunks"].extend(bm25)
+
+    return result
+
+
+def merge_chunked(parts: List[Dict]) -> Dict:
+    """
+    Join chunk_pages results of consecutive page ranges of one document,
+    numbering BM25 chunks as if the document was chunked in one go.
+    """
+    merged = {"pages": 0, "content_pages": 0, "faiss_chunks": [], "bm25_chunks": [], "complete": True}
+
+    for part in parts:
+        merged["complete"] = merged["complete"] and part["complete"]
+        merged["pages"] += part["pages"]
+        merged["content_pages"] += part["content_pages"]
+        merged["faiss_chunks"].extend(part["faiss_chunks"])
+
+        offset = len(merged["bm25_chunks"])
+        for chunk in part["bm25_chunks"]:
+            chunk["chunk_id"] += offset
+        merged["bm25_chunks"].extend(part["bm25_chunks"])
+
+    return merged
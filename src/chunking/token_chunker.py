@@ -0,0 +1,133 @@
+from functools import lru_cache
+from typing import List
+
+from src.chunking.chunker import split_into_sentences
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model_name: str):
+    """Fast tokenizer of the embedding model, loaded once per process (parse workers)"""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
+class TokenChunker:
+    """
+    Packs cleaned paragraphs into chunks that fit the embedding model window.
+
+    Lengths are measured with the model's own tokenizer, in one batch per
+    page (paragraphs) plus one for the sentences of over-long paragraphs.
+    A paragraph longer than the window is split into sentences, a sentence
+    longer than the window into token windows (by character offsets), so no
+    text is cut off by truncation in the model. Consecutive chunks share
+    trailing units of up to `overlap_tokens` tokens.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int = 128, overlap_tokens: int = 0):
+        self.tokenizer = tokenizer
+        # room for the special tokens the model adds (<s> ... </s>)
+        self.budget = max_tokens - tokenizer.num_special_tokens_to_add()
+        self.overlap = min(overlap_tokens, self.budget // 2)
+
+    def _lengths(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = self.tokenizer(texts, add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _split_tokens(self, text: str, budget: int | None = None) -> list:
+        budget = budget or self.budget
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoded["offset_mapping"]
+        step = budget - min(self.overlap, budget // 2)
+
+        pieces = []
+        for start in range(0, len(offsets), step):
+            window = offsets[start:start + budget]
+            pieces.append((text[window[0][0]:window[-1][1]], len(window)))
+            if start + budget >= len(offsets):
+                break
+        return pieces
+
+    def _units(self, paragraphs: List[str]) -> list:
+        """(text, n_tokens) pieces that each fit the budget, in text order"""
+        lengths = self._lengths(paragraphs)
+
+        sentences = {
+            i: split_into_sentences(p)
+            for i, (p, n) in enumerate(zip(paragraphs, lengths)) if n > self.budget
+        }
+        flat = [s for sents in sentences.values() for s in sents]
+        sentence_lengths = iter(self._lengths(flat))
+
+        units = []
+        for i, (p, n) in enumerate(zip(paragraphs, lengths)):
+            if i not in sentences:
+                units.append((p, n))
+                continue
+            for s in sentences[i]:
+                k = next(sentence_lengths)
+                if k <= self.budget:
+                    units.append((s, k))
+                else:
+                    units.extend(self._split_tokens(s))
+        return units
+
+    def chunk(self, paragraphs: List[str]) -> List[str]:
+        chunks = []
+        current, current_len = [], 0
+
+        for text, n in self._units(paragraphs):
+            if current and current_len + n > self.budget:
+                chunks.append(" ".join(t for t, _ in current))
+
+                # carry the tail of the chunk over as overlap
+                keep, keep_len = [], 0
+                for t, m in reversed(current):
+                    if keep_len + m > self.overlap or keep_len + m + n > self.budget:
+                        break
+                    keep.insert(0, (t, m))
+                    keep_len += m
+                current, current_len = keep, keep_len
+
+            current.append((text, n))
+            current_len += n
+
+        if current:
+            chunks.append(" ".join(t for t, _ in current))
+
+        return chunks
+
+    def chunk_table(self, header: str, rows: List[str]) -> List[str]:
+        """
+        Pack table rows (one line each) into chunks that all start with the
+        header row, so every chunk tells what its columns are. Rows are kept
+        as they are, one per line; a row longer than what the header leaves
+        of the window is split into token windows. Chunks do not overlap,
+        the header gives the context.
+        """
+        header_len, *lengths = self._lengths([header, *rows])
+        if header_len > self.budget // 2:
+            # leave at least half of the window to the rows
+            header, header_len = self._split_tokens(header, self.budget // 2)[0]
+        if not rows:
+            return [header]
+
+        budget = self.budget - header_len
+        units = []
+        for row, n in zip(rows, lengths):
+            units.extend([(row, n)] if n <= budget else self._split_tokens(row, budget))
+
+        chunks = []
+        current, current_len = [], 0
+        for text, n in units:
+            if current and current_len + n > budget:
+                chunks.append("\n".join([header, *current]))
+                current, current_len = [], 0
+            current.append(text)
+            current_len += n
+
+        if current:
+            chunks.append("\n".join([header, *current]))
+
+        return chunks
@@ -0,0 +1,87 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from config.config import Config
+from src.vector_store.bm25_store import BM25Store, bm25_tokenize
+from src.vector_store.chunk_store import ChunkStore
+
+
+EVAL_FILE = 'data/eval/gold_queries.json'
+QUERY_LENGTHS = (3, 5, 10, 20, 40)
+
+
+def make_queries(bm25: BM25Store, n: int, length: int, rng) -> list[list[str]]:
+    """Long queries: the first `length` tokens of random indexed chunks"""
+    ids = bm25.ids
+    queries = []
+    for i in rng.choice(len(ids), size=min(n, len(ids)), replace=False):
+        tokens = bm25_tokenize(bm25.chunks.text(ids[i]))
+        if len(tokens) >= length:
+            queries.append(tokens[:length])
+    return queries
+
+
+def eval_queries() -> list[list[str]]:
+    if not Path(EVAL_FILE).exists():
+        return []
+    with open(EVAL_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [bm25_tokenize(q) for item in data for q in item["queries"]]
+
+
+def bench(index, queries: list, top_k: int, pruning: str) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = [index.top_k(q, top_k, pruning=pruning) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 query latency: exhaustive vs MaxScore")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50, help="Queries per length")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = Config()
+    chunk_store = ChunkStore(config.paths['chunk_store'])
+    bm25 = BM25Store(chunk_store).load(config.paths['bm25_index'])
+    index = bm25.index
+
+    logger.info(f"BM25 index: {len(index)} chunks, {len(index.vocab)} terms")
+
+    rng = np.random.default_rng(0)
+    sets = [(f"{n} tokens", make_queries(bm25, args.queries, n, rng)) for n in QUERY_LENGTHS]
+    sets.append(("eval queries", eval_queries()))
+
+    print(f"\n{'queries':>14} {'n':>5} {'none, ms':>10} {'maxscore, ms':>13} {'speedup':>8}")
+    for name, queries in sets:
+        if not queries:
+            continue
+
+        # warm-up: caches of the index (norms, tail bounds)
+        bench(index, queries, args.top_k, "maxscore")
+
+        times = {}
+        for pruning in ("none", "maxscore"):
+            runs = [bench(index, queries, args.top_k, pruning) for _ in range(args.repeat)]
+            times[pruning] = min(t for t, _ in runs)
+            results = runs[0][1]
+            if pruning == "none":
+                expected = results
+            else:
+                # MaxScore is exact: the same top-k scores
+                for (_, got), (_, want) in zip(results, expected):
+                    assert np.allclose(got, want), "MaxScore top-k differs from exhaustive"
+
+        print(
+            f"{name:>14} {len(queries):>5} {1000 * times['none']:>10.2f} "
+            f"{1000 * times['maxscore']:>13.2f} {times['none'] / times['maxscore']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import json
 from loguru import logger
 
 from src.vector_store.bm25_store import BM25Store
+from src.vector_store.chunk_store import ChunkStore
 from src.search.expand_bm25_context import expand_bm25_context
 from src.search.merge_expanded_blocks import merge_expanded_blocks
 from src.search.faiss_on_expanded_blocks import faiss_select_from_blocks
@@ -22,12 +23,11 @@ def main():
 
     config = Config()
 
-    bm25 = BM25Store()
+    chunk_store = ChunkStore(config.paths['chunk_store'])
+    bm25 = BM25Store(chunk_store)
     embedder = Embedder()
     bm25.load(config.paths['bm25_index'])
 
-    all_chunks = bm25.documents
-
     eval_data = load_eval_queries(EVAL_FILE)
 
     for item in eval_data:
@@ -49,7 +49,7 @@ def main():
             # 🔹 2. Расширяем контекст
             expanded_blocks = expand_bm25_context(
                 bm25_hits=bm25_hits,
-                all_chunks=all_chunks,
+                chunk_store=chunk_store,
                 window_before=4,
                 window_after=15,
             )
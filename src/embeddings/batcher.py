@@ -0,0 +1,147 @@
+from typing import Any, List
+
+import numpy as np
+from loguru import logger
+
+
+class EmbeddingBatcher:
+    """
+    Collects chunk texts across documents and encodes them in full batches of
+    similar token length.
+
+    Sending one document at a time gives tiny batches for small files and
+    mixes 20-word and 800-word chunks in one padded batch for large ones.
+    Here texts are buffered until `batch_size * buffer_batches` are waiting,
+    sorted by token length and cut into full batches, so every batch is
+    padded only up to its own longest text. Leftovers (less than one batch)
+    stay in the buffer for the next round; `flush()` encodes them at the end.
+
+    Each document is returned by `add`/`flush` once all of its vectors are
+    ready, together with the (n_texts, dim) array in the original order.
+
+    If the embedder has a cache, cached texts are resolved in `add` and only
+    the misses are pooled, so batches stay full of real work.
+
+    If encoding a batch raises, every document with texts in that batch
+    fails: its other texts are dropped and `take_failed()` returns it with
+    the error, so the caller can count it instead of waiting for it forever.
+    """
+
+    def __init__(self, embedder, batch_size: int = 64, buffer_batches: int = 8):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.buffer_size = batch_size * max(1, buffer_batches)
+
+        self._pending = []   # (token_len, slot_id, row, text)
+        self._slots = {}     # slot_id -> [item, vectors, remaining]
+        self._next_slot = 0
+        self._failed = []    # (item, exception)
+
+        self.batches = 0
+        self.texts = 0
+        self.padded_tokens = 0
+        self.real_tokens = 0
+
+    def add(self, item: Any, texts: List[str]) -> list:
+        """
+        Queue the texts of one document.
+
+        :return: List of (item, vectors) for documents that are complete
+        """
+        slot_id = self._next_slot
+        self._next_slot += 1
+
+        if not texts:
+            return [(item, None)]
+
+        cache = self.embedder.cache
+        if cache is not None:
+            vectors, missing = cache.get_many(texts)
+            if not missing:
+                return [(item, vectors)]
+        else:
+            vectors, missing = [None] * len(texts), range(len(texts))
+
+        self._slots[slot_id] = [item, list(vectors), len(missing)]
+
+        missing_texts = [texts[row] for row in missing]
+        lengths = self.embedder.token_lengths(missing_texts)
+        self._pending.extend(
+            (n, slot_id, row, text)
+            for row, n, text in zip(missing, lengths, missing_texts)
+        )
+
+        if len(self._pending) < self.buffer_size:
+            return []
+
+        return self._encode(full_only=True)
+
+    def flush(self) -> list:
+        """Encode everything that is left and return the remaining documents"""
+        return self._encode(full_only=False)
+
+    def take_failed(self) -> list:
+        """:return: (item, exception) of the documents failed since the last call"""
+        failed, self._failed = self._failed, []
+        return failed
+
+    def _fail(self, slot_ids: set, ex: Exception):
+        for slot_id in slot_ids:
+            slot = self._slots.pop(slot_id, None)
+            if slot is not None:
+                self._failed.append((slot[0], ex))
+        self._pending = [p for p in self._pending if p[1] not in slot_ids]
+
+    def _encode(self, full_only: bool) -> list:
+        self._pending.sort(key=lambda p: p[0])
+
+        n = len(self._pending)
+        if full_only:
+            n -= n % self.batch_size
+
+        ready, self._pending = self._pending[:n], self._pending[n:]
+        finished = []
+
+        for start in range(0, len(ready), self.batch_size):
+            # texts of documents failed in an earlier batch are skipped
+            batch = [p for p in ready[start:start + self.batch_size] if p[1] in self._slots]
+            if not batch:
+                continue
+
+            texts = [p[3] for p in batch]
+            try:
+                vectors = self.embedder.encode(texts, batch_size=len(batch))
+            except Exception as ex:
+                logger.exception(f"Embedding batch of {len(batch)} texts failed: {ex}")
+                self._fail({p[1] for p in batch}, ex)
+                continue
+
+            if self.embedder.cache is not None:
+                self.embedder.cache.put_many(texts, vectors)
+
+            self.batches += 1
+            self.texts += len(batch)
+            self.real_tokens += sum(p[0] for p in batch)
+            self.padded_tokens += batch[-1][0] * len(batch)
+
+            for (_, slot_id, row, _), vec in zip(batch, vectors):
+                slot = self._slots[slot_id]
+                slot[1][row] = vec
+                slot[2] -= 1
+
+                if slot[2] == 0:
+                    del self._slots[slot_id]
+                    finished.append((slot[0], np.stack(slot[1])))
+
+        return finished
+
+    def log_stats(self):
+        if not self.batches:
+            return
+
+        fill = self.real_tokens / max(self.padded_tokens, 1)
+        logger.info(
+            f"Embedding batches: {self.batches}, texts: {self.texts}, "
+            f"avg batch: {self.texts / self.batches:.1f}, "
+            f"token fill (real / padded): {fill:.1%}"
+        )
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import pickle
+import re
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+
+_SPACES_RE = re.compile(r"\s+")
+
+# Share of the cache dropped at once when it is full
+_EVICT_FRACTION = 0.1
+
+
+def normalize_for_cache(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk cache of embeddings.
+
+    Key: 16-byte BLAKE2b of (model name, normalized text), so the same text
+    embedded by another model never hits. Vectors live in a memory-mapped
+    float32 file (one row per entry), the index maps key -> row and keeps a
+    last-used tick per row. When `max_items` is reached the least recently
+    used 10% of rows are evicted and their rows reused.
+
+    Files (per model): vectors.f32, index.pkl. Single writer only: do not
+    run two ingests against the same cache directory at once.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int, max_items: int = 1_000_000):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_items = max_items
+
+        slug = re.sub(r"[^\w.-]+", "_", model_name)
+        self.dir = Path(cache_dir) / slug
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.dir / "vectors.f32"
+        self.index_file = self.dir / "index.pkl"
+
+        self.rows = {}          # key -> row
+        self.keys = []          # row -> key (None = free)
+        self.last_used = np.zeros(0, dtype=np.int64)
+        self.free = []
+        self.tick = 0
+        self.vectors = None
+        # keys changed since the last flush; hits alone only move ticks,
+        # those are written with the next change
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not self.index_file.exists() or not self.vectors_file.exists():
+            logger.info(f"Embedding cache: new cache in {self.dir}")
+            return
+
+        try:
+            with open(self.index_file, "rb") as f:
+                data = pickle.load(f)
+
+            if data["dim"] != self.dim or data["model"] != self.model_name:
+                raise ValueError("cache was built for another model")
+
+            self.keys = data["keys"]
+            self.last_used = data["last_used"]
+            self.tick = data["tick"]
+            self.rows = {k: i for i, k in enumerate(self.keys) if k is not None}
+            self.free = [i for i, k in enumerate(self.keys) if k is None]
+            self._map(len(self.keys))
+        except Exception as e:
+            logger.error(f"Embedding cache is unreadable, starting empty: {e}")
+            self.rows, self.keys, self.free = {}, [], []
+            self.last_used = np.zeros(0, dtype=np.int64)
+            self.vectors = None
+            return
+
+        logger.info(f"Embedding cache: {len(self.rows)} vectors in {self.dir}")
+
+    def _map(self, capacity: int):
+        """(Re)open the vectors file with room for `capacity` rows"""
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+
+        size = capacity * self.dim * 4
+        mode = "r+b" if self.vectors_file.exists() else "w+b"
+        with open(self.vectors_file, mode) as f:
+            f.truncate(size)
+
+        if capacity:
+            self.vectors = np.memmap(
+                self.vectors_file, dtype=np.float32, mode="r+",
+                shape=(capacity, self.dim))
+
+    def _grow(self, needed: int):
+        capacity = len(self.keys)
+        if capacity >= needed:
+            return
+
+        new_capacity = min(max(needed, capacity * 2, 1024), self.max_items)
+        self._map(new_capacity)
+        self.keys.extend([None] * (new_capacity - capacity))
+        self.free.extend(range(new_capacity - 1, capacity - 1, -1))
+        self.last_used = np.concatenate(
+            [self.last_used, np.zeros(new_capacity - capacity, dtype=np.int64)])
+
+    def _evict(self):
+        used = np.array([i for i, k in enumerate(self.keys) if k is not None])
+        n = max(1, int(len(used) * _EVICT_FRACTION))
+        victims = used[np.argpartition(self.last_used[used], n - 1)[:n]]
+
+        for row in victims.tolist():
+            del self.rows[self.keys[row]]
+            self.keys[row] = None
+            self.free.append(row)
+
+        # Persist the index before the freed rows are overwritten, so the
+        # index on disk never points at a row that now holds another vector
+        self.flush()
+
+        logger.info(f"Embedding cache: evicted {n} least recently used vectors")
+
+    def flush(self):
+        if self.vectors is not None:
+            self.vectors.flush()
+        if not self._dirty:
+            return
+
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "model": self.model_name,
+                "dim": self.dim,
+                "keys": self.keys,
+                "last_used": self.last_used,
+                "tick": self.tick,
+            }, f)
+        os.replace(tmp, self.index_file)
+        self._dirty = False
+
+        logger.info(
+            f"Embedding cache saved: {len(self.rows)} vectors "
+            f"(hits={self.hits}, misses={self.misses})")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def key(self, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.model_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(normalize_for_cache(text).encode("utf-8"))
+        return h.digest()
+
+    def get_many(self, texts: list) -> tuple[np.ndarray, list]:
+        """
+        :return: (vectors, missing) - vectors has a row for every text,
+                 rows listed in `missing` are not filled
+        """
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        missing = []
+        self.tick += 1
+
+        for i, text in enumerate(texts):
+            row = self.rows.get(self.key(text))
+            if row is None:
+                missing.append(i)
+                continue
+            out[i] = self.vectors[row]
+            self.last_used[row] = self.tick
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return out, missing
+
+    def put_many(self, texts: list, vectors):
+        self.tick += 1
+        self._dirty = self._dirty or bool(len(texts))
+
+        for text, vec in zip(texts, vectors):
+            key = self.key(text)
+            row = self.rows.get(key)
+
+            if row is None:
+                if not self.free:
+                    if len(self.keys) < self.max_items:
+                        self._grow(len(self.keys) + 1)
+                    else:
+                        self._evict()
+                row = self.free.pop()
+                self.rows[key] = row
+                self.keys[row] = key
+
+            self.vectors[row] = vec
+            self.last_used[row] = self.tick
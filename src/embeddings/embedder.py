@@ -1,36 +1,69 @@
 from sentence_transformers import SentenceTransformer
+import numpy as np
 import torch
 from loguru import logger
 
 
 class Embedder:
 
-    def __init__(self, model_name='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'):
+    def __init__(self, model_name='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2', batch_size: int = 32, cache=None):
         logger.info(f'Download model: {model_name}')
 
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache  # optional EmbeddingCache
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.model = SentenceTransformer(model_name, device=self.device)
 
         logger.info(f'The model run on device: {self.device}')
 
-    def embed(self, texts: list) -> list:
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+
+    def token_lengths(self, texts: list) -> list:
         """
-        Docstring for embed
-        
-        :param self: Description
-        :param text: Description
-        :type text: list
-        :return: Description
-        :rtype: list
+        Number of tokens the model will actually see for every text
+        (clipped to max_seq_length, special tokens included).
         """
+        encoded = self.model.tokenizer(
+            list(texts),
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
 
-        if isinstance(texts, str):
-            texts = [texts]
-
+    def encode(self, texts: list, batch_size: int | None = None) -> np.ndarray:
+        """Run the model, bypassing the cache"""
         return self.model.encode(
             texts, 
-            batch_size=32, 
+            batch_size=batch_size or self.batch_size, 
             convert_to_numpy=True,
             show_progress_bar=False
         )
 
+    def embed(self, texts: list, batch_size: int | None = None) -> list:
+        """
+        Embed texts; with a cache only the texts not seen before go to the model.
+
+        :param texts: Text or list of texts
+        :param batch_size: Model batch size, defaults to the one given at init
+        :return: Array (n_texts, dim)
+        :rtype: np.ndarray
+        """
+
+        if isinstance(texts, str):
+            texts = [texts]
+
+        if self.cache is None:
+            return self.encode(texts, batch_size)
+
+        vectors, missing = self.cache.get_many(texts)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = self.encode(missing_texts, batch_size)
+            vectors[missing] = encoded
+            self.cache.put_many(missing_texts, encoded)
+
+        return vectors
@@ -1,6 +1,7 @@
 from config.config import Config
 from pathlib import Path
 import json
+import os
 from loguru import logger
 
 
@@ -28,16 +29,47 @@ class DocRegistry:
 
     def _save(self):
         """Save registry to disk"""
-        with open(self.path, "w", encoding="utf-8") as f:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(self.docs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
 
+    def save(self):
+        self._save()
 
     def exists(self, doc_id, doc_hash):
         return (
             doc_id in self.docs and self.docs[doc_id]['hash'] == doc_hash
         )
-    
-    def register(self, doc_id, info):
+
+    def unchanged_stat(self, doc_id, st) -> bool:
+        """
+        Cheap check: same size and mtime as at the last ingest.
+        Only a stat() is needed, the file is not read.
+        """
+        info = self.docs.get(doc_id)
+        return (
+            info is not None
+            and info.get("size") == st.st_size
+            and info.get("mtime_ns") == st.st_mtime_ns
+        )
+
+    def get(self, doc_id):
+        return self.docs.get(doc_id)
+
+    def register(self, doc_id, info, save: bool = True):
         self.docs[doc_id] = info
-        self._save()
+        if save:
+            self._save()
+
+    def remove(self, doc_id, save: bool = True):
+        """Forget a document (e.g. the file was deleted from disk)"""
+        self.docs.pop(doc_id, None)
+        if save:
+            self._save()
+
+    def clear(self, save: bool = True):
+        self.docs = {}
+        if save:
+            self._save()
 
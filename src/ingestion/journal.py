@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from loguru import logger
+
+
+class IngestJournal:
+    """
+    Write-ahead journal of an ingest run (JSON lines, fsync'ed).
+
+    Events:
+        run_start          {"full": bool}
+        indexed            {"doc_id"}   document is in the in-memory stores
+        checkpoint_begin   {"doc_ids"}  stores are about to be flushed with these docs
+        checkpoint_commit               FAISS, BM25 and registry are all on disk
+        (run end)                       journal file is removed
+
+    The stores and the registry are separate files, so a crash in the middle
+    of a checkpoint can leave them out of step. The documents listed in an
+    uncommitted `checkpoint_begin` are exactly the ones that may be
+    inconsistent; recovery deletes them from both stores and the registry,
+    and the next incremental pass re-indexes them.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _append(self, event: dict):
+        event["ts"] = time.time()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read(self) -> list:
+        if not self.path.exists():
+            return []
+
+        events = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # torn last line after a crash
+                    break
+        return events
+
+    def recover(self) -> dict:
+        """
+        State of the previous run.
+
+        :return: {"unfinished": bool, "full": bool, "indexed": int,
+                  "uncommitted": set of doc_id that must be re-indexed}
+        """
+        state = {"unfinished": False, "full": False, "indexed": 0, "uncommitted": set()}
+        pending = None
+
+        for e in self._read():
+            kind = e.get("event")
+            if kind == "run_start":
+                state["unfinished"] = True
+                state["full"] = e.get("full", False)
+            elif kind == "indexed":
+                state["indexed"] += 1
+            elif kind == "checkpoint_begin":
+                pending = set(e["doc_ids"])
+            elif kind == "checkpoint_commit":
+                pending = None
+
+        if pending:
+            state["uncommitted"] = pending
+        return state
+
+    def start(self, full: bool):
+        self._append({"event": "run_start", "full": full})
+
+    def indexed(self, doc_id: str):
+        self._append({"event": "indexed", "doc_id": doc_id})
+
+    def begin_checkpoint(self, doc_ids):
+        self._append({"event": "checkpoint_begin", "doc_ids": sorted(doc_ids)})
+
+    def commit_checkpoint(self, full: bool):
+        """
+        Mark the checkpoint durable and compact the journal: everything before
+        it is reflected in the files on disk.
+        """
+        self._append({"event": "checkpoint_commit"})
+
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"event": "run_start", "full": full, "ts": time.time()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def finish(self):
+        if self.path.exists():
+            self.path.unlink()
+        logger.info("Ingest journal closed")
@@ -5,12 +5,15 @@ from typing import List, Tuple
 
 from loguru import logger
 from src.embeddings.embedder import Embedder
+from src.vector_store.chunk_store import ChunkStore
 from src.vector_store.faiss_store import FaissStore
-from src.vector_store.bm25_store import BM25Store
+from src.vector_store.bm25_store import open_bm25_store
 from src.search.hybrid_search import hybrid_search
 from src.reranker.reranker import Reranker
 from src.llm.postprocessing import postprocess_answer
 import os
+import time
+from pathlib import Path
 from collections import defaultdict
 from config.config import Config
 from src.search.expand_bm25_context import expand_bm25_context
@@ -273,8 +276,11 @@ class RAGPipeline:
 
     def __init__(self, model: str = config.llm['model'], top_k: int = config.retrieval['top_k']):
         self.embedder = Embedder()
-        self.faiss_store = FaissStore(dim=384)
-        self.bm25_store = BM25Store().load()
+        self.chunk_store = ChunkStore()
+        self.faiss_store = FaissStore(dim=384, chunks=self.chunk_store)
+        self.bm25_store = open_bm25_store(self.chunk_store).load()
+        self._index_mtimes = self._read_index_mtimes()
+        self._last_reload_check = time.monotonic()
         self.reranker = Reranker()
         self.model = model
         self.top_k = top_k
@@ -293,7 +299,56 @@ class RAGPipeline:
 
         logger.info(f'RAGPipeline is inited. model={self.model} top_k={self.top_k}, ollama_client={self.ollama_client_available}, ollama_exe={self.ollama_exe}')
 
+    def _read_index_mtimes(self) -> tuple:
+        files = (
+            self.chunk_store.path,
+            self.chunk_store.deltas_dir,                        # gets an entry by most saves
+            self.faiss_store.index_file,
+            Path(config.paths["bm25_index"]) / "CURRENT",     # replaced by every BM25 save
+        )
+        mtimes = []
+        for f in files:
+            try:
+                mtimes.append(os.stat(f).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def refresh_indexes(self, force: bool = False) -> bool:
+        """
+        Reload the chunk store, FAISS and BM25 if an ingest (e.g. watch mode) saved them since
+        they were loaded. Checked at most every retrieval.reload_check_sec.
+        If loading fails (files caught mid-checkpoint) the current indexes
+        stay in use and the reload is retried on the next check.
+
+        :return: True if the indexes were reloaded
+        """
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < config.retrieval['reload_check_sec']:
+            return False
+        self._last_reload_check = now
+
+        mtimes = self._read_index_mtimes()
+        if mtimes == self._index_mtimes:
+            return False
+
+        try:
+            chunk_store = ChunkStore(self.chunk_store.path)
+            faiss_store = FaissStore(
+                dim=self.faiss_store.dim, index_dir=self.faiss_store.index_dir, chunks=chunk_store)
+            bm25_store = open_bm25_store(chunk_store).load()
+        except Exception as e:
+            logger.warning(f'Index reload failed, keeping the loaded indexes: {e}')
+            return False
+
+        self.chunk_store, self.faiss_store, self.bm25_store = chunk_store, faiss_store, bm25_store
+        self._index_mtimes = mtimes
+        logger.info('Indexes reloaded after an ingest')
+        return True
+
     def retrieve(self, query: str):
+        self.refresh_indexes()
+
         # 1. Embed query
         q_emb = self.embedder.embed(query)[0]
 
@@ -305,7 +360,7 @@ class RAGPipeline:
         # 3. Расширяем контекст
         expanded_blocks = expand_bm25_context(
             bm25_hits=bm25_hits,
-            all_chunks=self.bm25_store.documents,
+            chunk_store=self.bm25_store.chunks,
             window_before=2,
             window_after=4)
 
@@ -1,18 +1,62 @@
+import re
 import docx
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 from pathlib import Path
 from loguru import logger
+from config.config import Config
 
 
+config = Config()
 
-def parse_docx(file_path: str) -> list:
+# "Heading 2", "Заголовок 2", "Title"
+_HEADING_RE = re.compile(r"^(?:heading|заголовок)\s*(\d+)$", re.IGNORECASE)
+
+
+def _heading_level(paragraph: Paragraph) -> int | None:
+    try:
+        name = paragraph.style.name or ""
+    except Exception:
+        return None
+
+    if name.lower() == "title":
+        return 0
+    m = _HEADING_RE.match(name.strip())
+    return int(m.group(1)) if m else None
+
+
+def _table_rows(table: Table):
+    for row in table.rows:
+        cells, last = [], None
+        for cell in row.cells:
+            # merged cells are returned once per grid column
+            if cell._tc is last:
+                continue
+            last = cell._tc
+            cells.append(" ".join(cell.text.split()))
+        if any(cells):
+            yield " | ".join(cells)
+
+
+def iter_docx(file_path: str, max_chars: int = config.ingest['docx_block_chars']):
 
     """
-    Docstring for parse_docx
-    
-    :param file_path: Description
+    Role: Extracting text from DOCX.
+    Functionality: Yields one record per section and metadata (path, file_type, page, sheet, section, page_type)
+
+    The body is walked once in document order. A heading paragraph starts a
+    new section, 'section' holds the heading path ("1. Общие > 1.2 Состав").
+    Paragraphs are accumulated only until the section ends or reaches
+    `max_chars`. A table becomes blocks of rows, each starting with the
+    header row, within the section it appears in; 'table_header' holds
+    that row (None for text), the chunker repeats it in every chunk of the
+    block (see chunk_table_page).
+
+    :param file_path: Path to file
     :type file_path: str
-    :return: Description
-    :rtype: list
+    :param max_chars: Size bound of a record (a single longer paragraph is kept whole)
+    :type max_chars: int
+    :return: Iterator of text and metadata
     """
 
     file_path = Path(file_path)
@@ -22,35 +66,87 @@ def parse_docx(file_path: str) -> list:
         doc = docx.Document(file_path)
     except Exception as ex:
         logger.error(f'Error during parsing DOCX {file_path}: {ex}')
-        return []
-    
-    paregraphs = "\n".join(
-        p.text.strip()
-        for p in doc.paragraphs
-        if p.text and p.text.strip())
+        return False
 
-    # TODO позже реализовать 'section', пока None
-    # for p in doc.paragraphs:
-    #     if p.style.name.startswith("Heading"):
-    #         current_section = p.text
+    headings = []       # (level, text) of the current heading path
+    lines, size = [], 0
+    count = 0
 
-    #     yield {
-    #         "text": p.text,
-    #         "section": current_section
-    #     }
+    def record(text, table_header=None):
+        return {'text': text,
+                'path': str(file_path),
+                'file_type': 'docx',
 
+                'page': None,
+                'sheet': None,
+                'section': " > ".join(h for _, h in headings) or None,
+                'table_header': table_header,
 
-    if not paregraphs:
-        logger.warning(f'DOCX is empty: {file_path}')
-        return []
-    
-    return [{'text': paregraphs,
-            'path': str(file_path),
-            'file_type': 'docx',
+                'page_type': 'content'}
+
+    def flush():
+        nonlocal lines, size
+        # blank line between paragraphs: the chunkers split on it
+        text = "\n\n".join(lines)
+        lines, size = [], 0
+        return record(text) if text else None
 
-            'page': None,
-            'sheet': None,
-            'section': None,
+    for el in doc.element.body.iterchildren():
+        tag = el.tag.rsplit('}', 1)[-1]
 
-            'page_type': None}]
+        if tag == 'p':
+            paragraph = Paragraph(el, doc)
+            text = paragraph.text.strip()
+            if not text:
+                continue
 
+            level = _heading_level(paragraph)
+            if level is not None:
+                if (rec := flush()) is not None:
+                    count += 1
+                    yield rec
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, text))
+
+            # a heading stays with the paragraph that follows it
+            only_heading = len(lines) == 1 and headings and lines[0] == headings[-1][1]
+            if lines and size + len(text) > max_chars and not only_heading:
+                count += 1
+                yield flush()
+
+            lines.append(text)
+            size += len(text) + 2
+
+        elif tag == 'tbl':
+            if (rec := flush()) is not None:
+                count += 1
+                yield rec
+
+            rows = _table_rows(Table(el, doc))
+            header = next(rows, None)
+            if header is None:
+                continue
+
+            block, block_size = [], len(header) + 1
+            for row in rows:
+                if block and block_size + len(row) > max_chars:
+                    count += 1
+                    yield record("\n".join([header, *block]), header)
+                    block, block_size = [], len(header) + 1
+                block.append(row)
+                block_size += len(row) + 1
+
+            count += 1
+            yield record("\n".join([header, *block]), header)
+
+    if (rec := flush()) is not None:
+        count += 1
+        yield rec
+
+    if not count:
+        logger.warning(f'DOCX is empty: {file_path}')
+
+
+def parse_docx(file_path: str) -> list:
+    return list(iter_docx(file_path))
@@ -1,50 +1,108 @@
-import pandas as pd
+import datetime
+import openpyxl
 from pathlib import Path
 from loguru import logger
-from src.parsers.page_classifier import detect_page_type
+from config.config import Config
 
 
-def parse_excel(file_path: str) -> list:
+config = Config()
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time(0):
+        return value.date().isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _row_text(row) -> str:
+    cells = [_cell_text(v) for v in row]
+    while cells and not cells[-1]:
+        cells.pop()
+    return " | ".join(cells)
+
+
+def iter_excel(file_path: str, max_chars: int = config.ingest['excel_block_chars']):
 
     """
-    Role: Extracting text from XLS/XLSX.
-    Functionality: Returns text from cells and metadata (path, file_type, page, sheet, section, page_type)
+    Role: Extracting text from XLSX.
+    Functionality: Yields blocks of rows and metadata (path, file_type, page, sheet, section, page_type)
+
+    The workbook is read once, in read-only (streaming) mode. The first
+    non-empty row of a sheet is taken as its header; following rows are
+    grouped into blocks of up to `max_chars` characters, each starting with
+    the header so a block is readable on its own. 'section' holds the row
+    range of the block, 'table_header' the header row (the chunker repeats
+    it in every chunk of the block, see chunk_table_page).
 
     :param file_path: Path to file
     :type file_path: str
-    :return: Text and metadata
-    :rtype: list
+    :param max_chars: Size bound of a block (a single longer row is kept whole)
+    :type max_chars: int
+    :return: Iterator of text and metadata
     """
 
     file_path = Path(file_path)
     logger.info(f'Parsing excel: {file_path}')
 
-    results = []
-
     try:
-        xls = pd.ExcelFile(file_path)
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
     except Exception as ex:
         logger.error(f'Error during parsing Excel file {file_path}: {ex}')
-        return []
-    
-    for sheet in xls.sheet_names:
-        df = pd.read_excel(file_path, sheet_name=sheet, dtype=str).fillna("")
+        return False
 
-        for row in df.itertuples(index=False):
-            text = " | ".join(map(str, row))
+    def block(sheet, header, lines, first_row, last_row):
+        return {
+            'text': "\n".join([header, *lines]),
+            'path': str(file_path),
+            'file_type': 'xlsx',
 
-            if text.strip():
-                results.append({
-                    'text': text,
-                    'path': str(file_path),
-                    'file_type': 'xlsx',
+            'page': None,
+            'sheet': sheet,
+            'section': f'rows {first_row}-{last_row}',
+            'table_header': header,
 
-                    'page': None,
-                    'sheet': sheet,
-                    'section': None,
+            'page_type': 'content'}
 
-                    'page_type': None}
-                    )
-    
-    return results
+    try:
+        for ws in wb.worksheets:
+            header = header_row = None
+            lines, size = [], 0
+            first_row = last_row = None
+
+            for row_num, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                text = _row_text(row)
+                if not text.replace("|", "").strip():
+                    continue
+
+                if header is None:
+                    header, header_row = text, row_num
+                    continue
+
+                if lines and size + len(text) > max_chars:
+                    yield block(ws.title, header, lines, first_row, last_row)
+                    lines = []
 
+                if not lines:
+                    size = len(header) + 1
+                    first_row = row_num
+                lines.append(text)
+                size += len(text) + 1
+                last_row = row_num
+
+            if lines:
+                yield block(ws.title, header, lines, first_row, last_row)
+            elif header is not None:
+                # a single-row sheet: the "header" is the only content
+                yield block(ws.title, header, [], header_row, header_row)
+    finally:
+        wb.close()
+
+
+def parse_excel(file_path: str) -> list:
+    return list(iter_excel(file_path))
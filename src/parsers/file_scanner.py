@@ -7,7 +7,7 @@ from loguru import logger
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.xlsx', '.txt'} # , 
 
 
-def scan_raw_data(root_dir: str = 'data/raw') -> list:
+def scan_raw_data(root_dir: str = 'data/raw', verbose: bool = True) -> list:
     """
     Role:
         File search on disk, filtering by extension.
@@ -23,6 +23,8 @@ def scan_raw_data(root_dir: str = 'data/raw') -> list:
     
     :param root_dir: Path to dir
     :type root_dir: str
+    :param verbose: Log every file (off for the periodic scans of watch mode)
+    :type verbose: bool
     :return: List of files with paths
     :rtype: list
     """
@@ -34,18 +36,19 @@ def scan_raw_data(root_dir: str = 'data/raw') -> list:
         logger.warning(f"The directory {root_path} was not found.")
         return files_list
     
-    logger.info(f"Scanning the directory {root_dir}")
+    log = logger.info if verbose else logger.debug
+    log(f"Scanning the directory {root_dir}")
 
     for dirpath, _, filenames in os.walk(root_path):
         for file in filenames:
             file_path = Path(dirpath) / file
             if file_path.suffix.lower() in ALLOWED_EXTENSIONS:
                 files_list.append(str(file_path))
-                logger.info(f'Tha file has been found: {file_path}')
+                log(f'Tha file has been found: {file_path}')
             else:
                 logger.debug(f'The file has passed: {file_path}')
     
-    logger.info(f'Total liles found: {len(files_list)}')
+    log(f'Total liles found: {len(files_list)}')
 
     return files_list
 
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from loguru import logger
+from config.config import Config
+
+
+config = Config()
+
+# Bump when a parser changes its output, so old entries are not reused
+# (3: entries of documents whose parsing hit an error are no longer written,
+#  4: Excel blocks carry their header row as 'table_header', 5: DOCX tables too)
+PARSER_VERSION = 5
+
+
+def parser_fingerprint() -> str:
+    """Parser version plus the settings that change what the parsers emit"""
+    settings = {
+        "version": PARSER_VERSION,
+        "pdf_engine": config.ingest["pdf_engine"],
+        "excel_block_chars": config.ingest["excel_block_chars"],
+        "docx_block_chars": config.ingest["docx_block_chars"],
+        "txt_page_chars": config.ingest["txt_page_chars"],
+    }
+    data = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=4).hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed pages (iter_document output).
+
+    One gzip JSON-lines file per (content hash, parser fingerprint, page
+    range): re-chunking the corpus reads pages from here instead of parsing
+    PDFs and DOCX again. Entries are written through while a document is
+    parsed and renamed into place only when it completes, so a reader never
+    sees a partial file. Used from the parse worker processes; distinct
+    documents never write the same file.
+
+    The key is the content only: pages are stored without their 'path',
+    which is set to the document being read, so a copied or renamed file
+    does not cite the path it was first parsed from. A document whose
+    parser hit an error (iter_document returned False) is not cached.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.dir = Path(cache_dir)
+        self.fingerprint = parser_fingerprint()
+
+    def path(self, doc_hash: str, pages: range | None = None) -> Path:
+        name = f"{doc_hash}-{self.fingerprint}"
+        if pages is not None:
+            name += f"-p{pages.start}-{pages.stop - 1}"
+        return self.dir / doc_hash[:2] / f"{name}.jsonl.gz"
+
+    def read(self, doc_hash: str, doc_path: str, pages: range | None = None) -> Iterator[dict] | None:
+        """
+        :param doc_path: File being read, set as the 'path' of the pages
+        :return: Iterator over the cached pages, None on a miss
+        """
+        path = self.path(doc_hash, pages)
+        if not path.exists():
+            return None
+        return self._iter_file(path, str(Path(doc_path)))
+
+    @staticmethod
+    def _iter_file(path: Path, doc_path: str) -> Iterator[dict]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                page = json.loads(line)
+                page["path"] = doc_path
+                yield page
+
+    def write_through(self, doc_hash: str, pages_iter: Iterable[dict], pages: range | None = None) -> Iterator[dict]:
+        """
+        Yield the pages of `pages_iter` and store them as they pass. The
+        entry is kept only if the generator did not return False (the
+        parser hit an error and some pages are missing).
+
+        :return: (generator return value) False if the pages are incomplete
+        """
+        path = self.path(doc_hash, pages)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+        pages_iter = iter(pages_iter)
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+                while True:
+                    try:
+                        page = next(pages_iter)
+                    except StopIteration as stop:
+                        complete = stop.value is not False
+                        break
+                    stored = {k: v for k, v in page.items() if k != "path"}
+                    f.write(json.dumps(stored, ensure_ascii=False) + "\n")
+                    yield page
+
+            if complete:
+                os.replace(tmp, path)
+            else:
+                logger.warning(f"Document {doc_hash} was parsed with errors, not cached")
+        finally:
+            # consumer stopped early or parsing raised
+            if tmp.exists():
+                tmp.unlink()
+
+        return complete
+
+    def pages(self, doc_hash: str, doc_path: str, pages_iter_fn, pages: range | None = None) -> Iterator[dict]:
+        """
+        Cached pages of the document if present, otherwise parse with
+        `pages_iter_fn()` and cache the result. Like iter_document, the
+        iterator returns False if parsing hit an error (a cached entry is
+        always complete).
+        """
+        cached = self.read(doc_hash, doc_path, pages)
+        if cached is not None:
+            logger.debug(f"Parse cache hit: {doc_hash}")
+            return cached
+        return self.write_through(doc_hash, pages_iter_fn(), pages)
@@ -1,38 +1,49 @@
 from pathlib import Path
 from loguru import logger
 
-from .pdf_parser import parse_pdf
-from .docx_parser import parse_docx
-from .excel_parser import parse_excel
-from .txt_parser import parse_txt
+from .pdf_parser import iter_pdf
+from .docx_parser import iter_docx
+from .excel_parser import iter_excel
+from .txt_parser import iter_txt
 
 
-def parse_document(file_path: str) -> list:
+def iter_document(file_path: str, pages: range | None = None):
+    """
+    Yield the pages of a document one at a time, so a consumer that handles
+    each page as it comes holds a page in memory, not the whole document.
+
+    :param pages: PDF page numbers to read (default: all)
+    :return: (generator return value) False if parsing hit an error and
+             pages may be missing, so the result must not be cached
+    """
     file_path = Path(file_path)
 
     if not file_path.exists():
         logger.warning(f"File not found: {file_path}")
-        return []
+        return False
 
     if not file_path.is_file():
         logger.warning(f"Not a file: {file_path}")
-        return []
+        return False
 
     ext = file_path.suffix.lower()
 
     if ext == '.pdf':
-        return parse_pdf(file_path)
-    
+        return (yield from iter_pdf(file_path, pages=pages))
+
     elif ext == '.docx':
-        return parse_docx(file_path)
-    
+        return (yield from iter_docx(file_path))
+
     elif ext == '.xlsx':
-        return parse_excel(file_path)
-    
+        return (yield from iter_excel(file_path))
+
     elif ext == '.txt':
-        return parse_txt(file_path)
-    
+        return (yield from iter_txt(file_path))
+
     else:
         logger.warning(f'Unexpected format: {file_path}')
-        return []
-    
+        return False
+
+
+def parse_document(file_path: str) -> list:
+    return list(iter_document(file_path))
@@ -0,0 +1,273 @@
+import os
+from collections import deque
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, Tuple
+
+from loguru import logger
+
+from src.parsers.parse_manager import iter_document
+from src.parsers.pdf_parser import pdf_page_count
+from src.parsers.parse_cache import ParseCache
+from src.chunking.document import chunk_pages, merge_chunked
+from src.utils.hash import file_hash
+
+
+def resolve_workers(workers: int | None) -> int:
+    """0 / None means all CPU cores"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _chunk_document(path: str, doc_hash: str, pages: range | None, cache_dir: str | None) -> dict:
+    # Pages are chunked as they are parsed (or read from the parse cache),
+    # only the chunks go back to the main process. They are collected for
+    # the whole task and sent as one result, so the worker's memory grows
+    # with the chunks of the document (of the page range for a split PDF)
+    if not cache_dir:
+        return chunk_pages(iter_document(path, pages=pages))
+
+    stream = ParseCache(cache_dir).pages(
+        doc_hash, path, lambda: iter_document(path, pages=pages), pages)
+    return chunk_pages(stream)
+
+
+def _parse_worker(
+    path: str,
+    known_hash: str | None = None,
+    pages: range | None = None,
+    cache_dir: str | None = None,
+) -> tuple[str, dict | None]:
+    # Top-level function: must be picklable for the spawn start method (Windows)
+    # Hashing happens here, in parallel with parsing of other files; if the
+    # content turns out to be the same as last time, parsing is skipped
+    doc_hash = file_hash(path)
+    if doc_hash == known_hash:
+        return doc_hash, None
+    return doc_hash, _chunk_document(path, doc_hash, pages, cache_dir)
+
+
+def _parse_pages_worker(path: str, doc_hash: str, pages: range, cache_dir: str | None = None) -> tuple[None, dict]:
+    # Later page ranges of a split PDF: the first range already hashed the file
+    return None, _chunk_document(path, doc_hash, pages, cache_dir)
+
+
+def _file_size(path) -> int:
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return 0
+
+
+def _page_ranges(path: Path, pages_per_task: int | None) -> list | None:
+    """1-based page ranges of a PDF longer than `pages_per_task`, else None"""
+    if not pages_per_task or path.suffix.lower() != ".pdf":
+        return None
+    try:
+        n = pdf_page_count(path)
+    except Exception:
+        # unreadable: parsed whole, the worker reports the error
+        return None
+    if n <= pages_per_task:
+        return None
+    return [range(s, min(s + pages_per_task, n + 1)) for s in range(1, n + 1, pages_per_task)]
+
+
+class _SplitDocs:
+    """
+    Page ranges of large PDFs in progress. The first range is submitted alone
+    (its worker hashes the file); the rest are queued only once it turns out
+    the content changed, and the document is yielded when all ranges are in.
+    """
+
+    def __init__(self, pages_per_task: int | None, known_hashes: dict, cache_dir: str | None):
+        self.pages_per_task = pages_per_task
+        self.known_hashes = known_hashes
+        self.cache_dir = cache_dir
+        self.docs = {}
+        self.failed = set()
+
+    def task(self, path: Path, pages: range | None):
+        """:return: (fn, args) for the pool, None if the document already failed"""
+        if path in self.failed:
+            return None
+
+        if pages is not None:
+            return _parse_pages_worker, (str(path), self.docs[path]["hash"], pages, self.cache_dir)
+
+        ranges = _page_ranges(path, self.pages_per_task)
+        if ranges:
+            self.docs[path] = {"ranges": ranges, "hash": None, "parts": {}}
+            logger.info(f"Splitting {path} into {len(ranges)} page ranges")
+            return _parse_worker, (str(path), self.known_hashes.get(path), ranges[0], self.cache_dir)
+
+        return _parse_worker, (str(path), self.known_hashes.get(path), None, self.cache_dir)
+
+    def done(self, path: Path, pages: range | None, result, error, queue: deque):
+        """:return: (path, hash, chunked, error) once the document is complete, else None"""
+        if path in self.failed:
+            return None
+
+        doc = self.docs.get(path)
+
+        if error is not None:
+            logger.error(f"Failed to parse {path}: {error}")
+            if doc is not None:
+                del self.docs[path]
+                self.failed.add(path)
+            return path, None, None, error
+
+        if doc is None:
+            return path, *result, None
+
+        doc_hash, parsed = result
+        if pages is None:
+            # first range (submitted as the whole file, see task())
+            pages = doc["ranges"][0]
+            if parsed is None:
+                del self.docs[path]
+                return path, doc_hash, None, None
+            doc["hash"] = doc_hash
+            # ahead of new files, so a started document finishes soon
+            queue.extendleft((path, r) for r in reversed(doc["ranges"][1:]))
+
+        doc["parts"][pages.start] = parsed
+        if len(doc["parts"]) < len(doc["ranges"]):
+            return None
+
+        del self.docs[path]
+        return path, doc["hash"], merge_chunked([doc["parts"][r.start] for r in doc["ranges"]]), None
+
+
+def parse_documents_parallel(
+    paths: Iterable,
+    workers: int | None = None,
+    max_in_flight: int | None = None,
+    known_hashes: dict | None = None,
+    pdf_pages_per_task: int | None = None,
+    parse_cache_dir: str | None = None,
+) -> Iterator[Tuple[Path, str | None, dict | None, Exception | None]]:
+    """
+    Parse and chunk documents in a process pool and yield results as soon as
+    each file is done (completion order, not input order). Workers stream
+    the pages of a file into the chunkers (chunk_pages), so neither they nor
+    this process ever hold all parsed pages of a large document.
+
+    The chunks are not streamed: a document is yielded with all of its
+    chunks, as dedup, embedding and indexing work per document. Memory for
+    raw pages is bounded by the page size; memory for chunks still grows
+    with the document. In workers a split PDF holds one page range of chunks;
+    DOCX, Excel and TXT files, and the reassembled PDF here, hold them all.
+
+    Largest files are submitted first so the pool does not end up waiting on
+    one big manual at the tail of the run. A PDF with more than
+    `pdf_pages_per_task` pages is split into page ranges parsed by several
+    workers and reassembled in page order. At most `max_in_flight` tasks are
+    submitted at a time, which bounds the memory held by finished results
+    that the consumer has not taken yet.
+
+    A file that raises does not stop the run. If a worker dies (segfault in a
+    native parser, OOM kill) the pool is recreated and the tasks that were in
+    flight are retried one by one in an isolated worker, so only the file that
+    actually crashes is reported as failed.
+
+    :param paths: Files to parse
+    :param workers: Number of processes, 0/None = all cores, 1 = in-process
+    :param max_in_flight: Submitted but not yet consumed tasks, 0/None = 2 * workers
+    :param known_hashes: path -> content hash from the last ingest; a file
+                         with the same hash is not parsed
+    :param pdf_pages_per_task: Page range size for splitting large PDFs, 0/None = never split
+    :param parse_cache_dir: ParseCache directory, parsed pages are reused from
+                            and stored there (None = no cache)
+    :return: Iterator of (path, hash, chunked, error). chunked is the
+             chunk_pages result (chunked["complete"] is False when the
+             parser hit an error); None when error is set, or when the
+             content is unchanged (error is None then)
+    """
+    workers = resolve_workers(workers)
+    known_hashes = {Path(p): h for p, h in (known_hashes or {}).items()}
+    paths = sorted((Path(p) for p in paths), key=_file_size, reverse=True)
+
+    if not paths:
+        return
+
+    if workers == 1:
+        for path in paths:
+            try:
+                yield path, *_parse_worker(str(path), known_hashes.get(path), None, parse_cache_dir), None
+            except Exception as ex:
+                yield path, None, None, ex
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    logger.info(f"Parsing {len(paths)} files with {workers} processes")
+
+    queue = deque((path, None) for path in paths)
+    split = _SplitDocs(pdf_pages_per_task, known_hashes, parse_cache_dir)
+    suspects = []
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    in_flight = {}
+
+    try:
+        while True:
+            while len(in_flight) < max_in_flight and queue:
+                path, pages = queue.popleft()
+                task = split.task(path, pages)
+                if task is not None:
+                    fn, args = task
+                    in_flight[pool.submit(fn, *args)] = (path, pages)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            broken = False
+            for future in done:
+                path, pages = in_flight.pop(future)
+                result, error = None, None
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    suspects.append((path, pages))
+                    broken = True
+                    continue
+                except Exception as ex:
+                    error = ex
+
+                finished = split.done(path, pages, result, error, queue)
+                if finished is not None:
+                    yield finished
+
+            if broken:
+                logger.warning("Parse worker died, restarting the pool")
+                suspects.extend(in_flight.values())
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Suspects one at a time; a first page range that succeeds here queues
+    # the rest of its document, which is parsed the same way
+    retry = deque(suspects)
+    while retry or queue:
+        path, pages = retry.popleft() if retry else queue.popleft()
+        task = split.task(path, pages)
+        if task is None:
+            continue
+        result, error = _parse_isolated(*task)
+        finished = split.done(path, pages, result, error, queue)
+        if finished is not None:
+            yield finished
+
+
+def _parse_isolated(fn, args: tuple):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(fn, *args).result(), None
+        except Exception as ex:
+            return None, ex
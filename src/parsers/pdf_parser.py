@@ -1,51 +1,132 @@
 import pdfplumber
+import pymupdf
 from loguru import logger
 from pathlib import Path
+from config.config import Config
 from src.parsers.page_classifier import detect_page_type
 
 
-def parse_pdf(file_path: str) -> list:
+config = Config()
+
+# A page whose PyMuPDF text is mostly U+FFFD has fonts without a usable
+# ToUnicode map; pdfplumber sometimes decodes those
+_GARBLED_RATIO = 0.1
+
+
+def pdf_page_count(file_path) -> int:
+    with pymupdf.open(file_path) as doc:
+        return doc.page_count
+
+
+def _garbled(text: str) -> bool:
+    return text.count('�') > len(text) * _GARBLED_RATIO
+
+
+class _PlumberFallback:
+    """pdfplumber document opened on first use, only if some page needs it"""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.pdf = None
+
+    def extract(self, page_num: int) -> str:
+        if self.pdf is None:
+            self.pdf = pdfplumber.open(self.file_path)
+        return self.pdf.pages[page_num - 1].extract_text() or ''
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+
+
+def _extract_pymupdf(file_path: Path, pages: range | None):
+    """
+    Yield (page_num, text); pages PyMuPDF fails on are read with pdfplumber.
+    A page neither can read is yielded with text None.
+    """
+    fallback = _PlumberFallback(file_path)
+
+    try:
+        with pymupdf.open(file_path) as doc:
+            for page_num in pages or range(1, doc.page_count + 1):
+                try:
+                    text = doc[page_num - 1].get_text('text', sort=True)
+                    if not _garbled(text):
+                        yield page_num, text
+                        continue
+                    reason = 'garbled text'
+                except Exception as ex:
+                    reason = ex
+
+                logger.debug(f'PyMuPDF failed on page {page_num} ({file_path}): {reason}, using pdfplumber')
+                try:
+                    yield page_num, fallback.extract(page_num)
+                except Exception as ex:
+                    logger.warning(f'Failed to extract page {page_num} ({file_path}): {ex}')
+                    yield page_num, None
+    finally:
+        fallback.close()
+
+
+def _extract_pdfplumber(file_path: Path, pages: range | None):
+    with pdfplumber.open(file_path) as pdf:
+        for page_num in pages or range(1, len(pdf.pages) + 1):
+            yield page_num, pdf.pages[page_num - 1].extract_text() or ''
+
+
+def iter_pdf(file_path: str, pages: range | None = None, engine: str = config.ingest['pdf_engine']):
 
     """
     Role: Extracting information from a PDF document.
-    Functionality: Returns text from a page and metadata (path, file_type, page, sheet, section, page_type)
+    Functionality: Yields text of one page at a time and metadata (path, file_type, page, sheet, section, page_type)
 
     :param file_path: path to PDF-file
     :type file_path: str
-    :return: List of Dicts with keys: 'text', 'file_type', 'page', 'sheet', 'section', 'page_type'
-    :rtype: list
+    :param pages: 1-based page numbers to extract (default: all), used to split large PDFs across workers
+    :type pages: range | None
+    :param engine: 'pymupdf' (fast, pdfplumber fallback per page) or 'pdfplumber'
+    :type engine: str
+    :return: Iterator of Dicts with keys: 'text', 'file_type', 'page', 'sheet', 'section', 'page_type';
+             the generator returns False if some pages could not be extracted
     """
 
     file_path = Path(file_path)
 
-    results = []
-    logger.info(f'Starting to parse PDF file: {file_path}')
+    count = 0
+    complete = True
+    logger.info(f'Starting to parse PDF file: {file_path}' + (f' (pages {pages.start}-{pages.stop - 1})' if pages else ''))
+
+    extract = _extract_pdfplumber if engine == 'pdfplumber' else _extract_pymupdf
 
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, start=1):
-                text = page.extract_text()
+        for page_num, text in extract(file_path, pages):
+            if text is None:
+                complete = False
+                continue
 
-                if not text:
-                    logger.warning(f'There is not text on the page {page_num} ({file_path})')
-                    continue
+            if not text.strip():
+                logger.warning(f'There is not text on the page {page_num} ({file_path})')
+                continue
 
-                results.append({
-                    'text': text,
-                    'path': str(file_path),
-                    'file_type': 'pdf',
+            count += 1
+            yield {
+                'text': text,
+                'path': str(file_path),
+                'file_type': 'pdf',
 
-                    'page': page_num,
-                    'sheet': None,
-                    'section': None,
+                'page': page_num,
+                'sheet': None,
+                'section': None,
 
-                    'page_type': detect_page_type(text)}
-                    )
+                'page_type': detect_page_type(text)}
     except Exception as ex:
         logger.info(f'Error during parsing PDF {file_path}: {ex}')
+        complete = False
 
-    logger.info(f'Done: extracted {len(results)} страниц.')
-    
-    return results
+    logger.info(f'Done: extracted {count} страниц.')
+    return complete
 
 
+def parse_pdf(file_path: str, pages: range | None = None, engine: str = config.ingest['pdf_engine']) -> list:
+    """All pages of iter_pdf as a list"""
+    return list(iter_pdf(file_path, pages=pages, engine=engine))
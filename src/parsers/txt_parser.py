@@ -1,25 +1,123 @@
+import codecs
 from pathlib import Path
 from loguru import logger
-from src.parsers.page_classifier import detect_page_type
+from config.config import Config
 
 
-def parse_txt(file_path: str) -> list:
+config = Config()
+
+# Bytes looked at to guess the encoding
+SAMPLE_BYTES = 64 * 1024
+# Characters read from the file at once
+READ_CHARS = 1 << 20
+
+# Most frequent Russian letters: decoded with the right 8-bit code page they
+# dominate the text, with the wrong one they turn into rare letters
+_FREQUENT_RU = set("оеаинтсрвлкмдпу")
+
+
+def detect_encoding(file_path: Path) -> str:
+    """
+    Guess the encoding from the first SAMPLE_BYTES: BOM, then strict UTF-8,
+    then the Cyrillic code page (cp1251 / koi8-r) whose decoding of the
+    sample looks most like Russian text.
+    """
+    with open(file_path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    try:
+        # final=False: the sample may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    def score(encoding: str) -> int:
+        text = sample.decode(encoding, errors="ignore")
+        return sum(c in _FREQUENT_RU for c in text)
+
+    return max(("cp1251", "koi8-r"), key=score)
+
+
+def _cut(buffer: str, start: int, max_chars: int) -> int:
+    """End of the page starting at `start`: last paragraph, line or word break within max_chars"""
+    for sep in ("\n\n", "\n", " "):
+        pos = buffer.rfind(sep, start + max_chars // 2, start + max_chars)
+        if pos != -1:
+            return pos + len(sep)
+    return start + max_chars
+
+
+def iter_txt(file_path: str, max_chars: int = config.ingest['txt_page_chars']):
+
+    """
+    Role: Extracting text from TXT.
+    Functionality: Yields virtual pages of up to `max_chars` characters and metadata (path, file_type, page, sheet, section, page_type)
+
+    The file is decoded while it is read in blocks, so memory does not grow
+    with the file size. Pages end at a paragraph (or line, or word) break
+    where possible; 'page' is the number of the virtual page.
+
+    :param file_path: Path to file
+    :type file_path: str
+    :param max_chars: Size bound of a virtual page
+    :type max_chars: int
+    :return: Iterator of text and metadata
+    """
+
     file_path = Path(file_path)
     logger.info(f'Prsing TXT fife: {file_path}')
 
     try:
-        text = file_path.read_text(encoding='utf-8', errors='ignore')
-    except:
-        text = file_path.read_text(encoding='utf-8', errors='ignore')
+        encoding = detect_encoding(file_path)
+    except OSError as ex:
+        logger.error(f'Error during parsing TXT {file_path}: {ex}')
+        return False
+
+    logger.debug(f'TXT encoding: {encoding} ({file_path})')
+
+    def page(text, num):
+        return {
+            'text': text,
+            'path': str(file_path),
+            'file_type': 'txt',
 
-    return {
-        'text': text,
-        'path': str(file_path),
-        'file_type': 'txt',
+            'page': num,
+            'sheet': None,
+            'section': None,
 
-        'page': None,
-        'sheet': None,
-        'section': None,
+            'page_type': 'content'}
 
-        'page_type': None}
+    num = 0
+    buffer, pos = "", 0
 
+    with open(file_path, "r", encoding=encoding, errors="replace", newline=None) as f:
+        while True:
+            block = f.read(READ_CHARS)
+            # keep only the unfinished tail of the previous block
+            buffer, pos = buffer[pos:] + block, 0
+
+            while len(buffer) - pos >= max_chars or (not block and pos < len(buffer)):
+                if len(buffer) - pos >= max_chars:
+                    end = _cut(buffer, pos, max_chars)
+                else:
+                    end = len(buffer)
+                text, pos = buffer[pos:end], end
+                if text.strip():
+                    num += 1
+                    yield page(text.strip(), num)
+
+            if not block:
+                break
+
+    if not num:
+        logger.warning(f'TXT is empty: {file_path}')
+
+
+def parse_txt(file_path: str) -> list:
+    return list(iter_txt(file_path))
@@ -0,0 +1,160 @@
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+
+from loguru import logger
+
+
+# Relative change that is reported as a regression in compare()
+REGRESSION_THRESHOLD = 0.10
+
+
+def peak_rss_mb() -> dict:
+    """
+    Peak resident memory of this process and of its (finished) children,
+    i.e. the parse workers. None where the platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return {"self": psutil.Process().memory_info().peak_wset / 2**20, "children": None}
+        except Exception:
+            return {"self": None, "children": None}
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+class IngestBenchmark:
+    """
+    Counters and timers of one ingest run, written as a JSON report.
+
+    Counters: files, pages, chunks, embeddings. Timers: index add and save
+    time. Stage wall/busy time comes from the pipeline StageStats.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.finished = None
+        self.counts = Counter()
+        self.timers = defaultdict(float)
+        self.stages = []
+
+    @contextmanager
+    def timed(self, name: str):
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += perf_counter() - t0
+
+    def finish(self, stage_stats: list):
+        self.finished = perf_counter()
+        self.stages = [s.as_dict() for s in stage_stats]
+
+    @property
+    def wall(self) -> float:
+        return (self.finished or perf_counter()) - self.started
+
+    def report(self) -> dict:
+        wall = self.wall
+
+        throughput = {
+            f"{name}_per_sec": round(self.counts[name] / wall, 3) if wall else 0.0
+            for name in ("files", "pages", "chunks", "embeddings")
+        }
+
+        return {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": {
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "cpu_count": os.cpu_count(),
+            },
+            "wall_sec": round(wall, 3),
+            "counts": dict(self.counts),
+            "throughput": throughput,
+            "timers_sec": {k: round(v, 3) for k, v in self.timers.items()},
+            "stages": self.stages,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def write(self, path: str) -> dict:
+        report = self.report()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        logger.success(f"Benchmark report saved to {path}")
+        return report
+
+
+def _metrics(report: dict) -> dict:
+    """Flat {name: (value, higher_is_better)} used for comparison"""
+    m = {"wall_sec": (report["wall_sec"], False)}
+
+    for k, v in report["throughput"].items():
+        m[k] = (v, True)
+    for k, v in report["timers_sec"].items():
+        m[f"{k}_sec"] = (v, False)
+    for s in report["stages"]:
+        m[f"stage_{s['name']}_busy_sec"] = (s["busy_sec"], False)
+
+    rss = report.get("peak_rss_mb") or {}
+    if rss.get("self") is not None:
+        m["peak_rss_mb"] = (rss["self"], False)
+
+    return m
+
+
+def compare_reports(current: dict, previous: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Compare two reports metric by metric.
+
+    :return: Names of metrics that got worse by more than `threshold`
+    """
+    cur, prev = _metrics(current), _metrics(previous)
+    regressions = []
+
+    logger.info(f"{'metric':<32} {'previous':>12} {'current':>12} {'change':>9}")
+
+    for name, (value, higher_is_better) in cur.items():
+        if name not in prev:
+            continue
+
+        old = prev[name][0]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+
+        flag = ""
+        if worse > threshold:
+            flag = "  <-- regression"
+            regressions.append(name)
+
+        logger.info(f"{name:<32} {old:>12.3f} {value:>12.3f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        logger.warning(f"Regressions (> {threshold:.0%}): {', '.join(regressions)}")
+    else:
+        logger.success("No regressions")
+
+    return regressions
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
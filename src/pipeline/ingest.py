@@ -1,20 +1,23 @@
 from pathlib import Path
 from loguru import logger
+import argparse
 import uuid
 import time
 
-from src.parsers.parse_manager import parse_document
+from src.parsers.parse_pool import parse_documents_parallel
 from src.parsers.file_scanner import scan_raw_data
-from src.chunking.chunker import filter_content_pages # progress_document,
 from src.embeddings.embedder import Embedder
+from src.embeddings.batcher import EmbeddingBatcher
+from src.embeddings.cache import EmbeddingCache
+from src.vector_store.chunk_store import ChunkStore
 from src.vector_store.faiss_store import FaissStore
-from src.vector_store.bm25_store import BM25Store
-from src.utils.hash import file_hash
+from src.vector_store.bm25_store import open_bm25_store
 from src.ingestion.doc_registry import DocRegistry
+from src.ingestion.journal import IngestJournal
+from src.pipeline.stages import run_pipeline, log_stage_stats
+from src.pipeline.benchmark import IngestBenchmark, compare_reports, load_report
 from config.config import Config
-# from src.chunking.chunker import chunk_document_by_paragraphs
-from src.chunking.chunker import chunk_document, filter_content_pages, chunk_document
-from src.chunking.bm25_chanking import chunk_document_for_bm25
+from src.chunking.dedup import MinHashDeduper, add_location, dedup_chunks, forget_locations, seed_deduper
 
 
 config = Config()
@@ -32,210 +35,598 @@ def log_chunk_stats(name, chunks):
     )
 
 
+def make_doc_id(path) -> str:
+    return str(uuid.uuid5(
+        uuid.NAMESPACE_URL,
+        str(Path(path).resolve())))
 
-def ingest_directory(root_folder='data/raw/1c-data'): #config.paths['data_dir']):
-    root = Path(root_folder)
 
-    if not root.exists():
-        logger.error(f"Folder not found: {root}")
-        return
+def chunk_metadata(c: dict, doc_id: str) -> dict:
+    return {
+        "doc_id": doc_id,
+        "path": c["path"],
+        "file_type": c["file_type"],
+        "sheet": c["sheet"],
+        "page": c["page"],
+        "section": c["section"],
+        "chunk_id": c["chunk_id"],
+        "type": c["type"],
+        # Same list object as the chunk's dedup record: locations found
+        # before the chunk is indexed go in with it (see add_location)
+        "duplicates": c.setdefault("duplicates", []),
+    }
+
+
+def check_chunks(path: Path, chunked: dict) -> tuple[list, list]:
+    """
+    Log what the parse workers made of one file.
+
+    :return: (faiss_chunks, bm25_chunks)
+    """
+    if not chunked["pages"]:
+        logger.warning(f"No content parsed: {path}")
+        return [], []
+
+    logger.info(f"Content pages: {chunked['content_pages']} / {chunked['pages']}")
+    if not chunked["content_pages"]:
+        logger.warning(f"No content pages after filtering: {path}")
+        return [], []
+
+    faiss_chunks, bm25_chunks = chunked["faiss_chunks"], chunked["bm25_chunks"]
+
+    if not faiss_chunks and not bm25_chunks:
+        logger.warning(f"No chunks after chunking & cleaning: {path}")
+
+    log_chunk_stats("FAISS", faiss_chunks)
+    log_chunk_stats("BM25", bm25_chunks)
+
+    return faiss_chunks, bm25_chunks
+
+
+def index_chunks(doc_id, faiss_chunks, embeddings, bm25_chunks, store, bm25):
+    if faiss_chunks:
+        ids = store.add(
+            embeddings=embeddings,
+            texts=[c["text"] for c in faiss_chunks],
+            metadatas=[chunk_metadata(c, doc_id) for c in faiss_chunks])
+        set_record_ids(faiss_chunks, ids)
+
+    if bm25_chunks:
+        ids = bm25.add(
+            texts=[c["text"] for c in bm25_chunks],
+            metadatas=[chunk_metadata(c, doc_id) for c in bm25_chunks])
+        set_record_ids(bm25_chunks, ids)
+
+
+def set_record_ids(chunks: list, ids):
+    """Later locations on these canonical chunks go through the store (add_location)"""
+    for c, i in zip(chunks, ids.tolist()):
+        if "dedup" in c:
+            c["dedup"]["id"] = i
+
+
+def chunk_stores(store, bm25) -> list:
+    """The ChunkStore, plus the chunks of the SQLite BM25 backend when it keeps its own"""
+    return [store.chunks] if bm25.chunks is store.chunks else [store.chunks, bm25.chunks]
 
-    logger.info(f"Start ingest from {root.resolve()}")
 
-    embedder = Embedder()
-    store = FaissStore(dim=config.embeddings['dim'], index_dir=config.paths['faiss_dir'])
-    bm25 = BM25Store()
-    registry = DocRegistry()
+def purge_missing(root: Path, seen_ids: set, registry, store, bm25, scope: set | None = None) -> tuple[set, set]:
+    """
+    Remove documents that are gone from disk, plus chunks that the stores
+    hold for documents the registry does not know about (runs made before
+    the registry was in use, or an interrupted checkpoint).
 
-    files = scan_raw_data(root_dir=root_folder)
+    :param scope: Only these resolved paths are checked (default: all under root)
+    :return: (removed, stale) doc_ids
+    """
+    root = root.resolve()
 
-    indexed_files = 0
-    total_chunks = 0
+    def in_scope(path: Path) -> bool:
+        if scope is not None:
+            return path in scope
+        return path.is_relative_to(root)
 
+    removed = {
+        doc_id for doc_id, info in registry.docs.items()
+        if doc_id not in seen_ids
+        and in_scope(Path(info["path"]).resolve())
+    }
+    stale = (store.doc_ids() | bm25.doc_ids()) - set(registry.docs)
+
+    to_delete = removed | stale
+    if not to_delete:
+        return removed, stale
+
+    logger.info(
+        f"Purging {len(removed)} deleted and {len(stale)} unregistered documents")
+
+    # their locations on the chunks they were deduplicated against; where
+    # those are is not known for unregistered documents
+    canonical = None if stale else {
+        d for doc_id in removed for d in registry.get(doc_id).get("depends_on", ())}
+    for chunks in chunk_stores(store, bm25):
+        forget_locations(chunks, to_delete, canonical)
+
+    store.delete_docs(to_delete)
+    bm25.delete_docs(to_delete)
+
+    for doc_id in removed:
+        registry.remove(doc_id, save=False)
+
+    return removed, stale
+
+
+class IngestContext:
+    """
+    Embedding model, stores and registry used by an ingest run.
+
+    ingest_directory creates a new one per call; watch mode keeps one alive
+    so the model and the indexes are not reloaded for every small batch.
+    """
+
+    def __init__(self):
+        self.cache = None
+        if config.embeddings['cache_max_items']:
+            self.cache = EmbeddingCache(
+                cache_dir=config.embeddings['cache_dir'],
+                model_name=config.embeddings['model'],
+                dim=config.embeddings['dim'],
+                max_items=config.embeddings['cache_max_items'])
+
+        self.embedder = Embedder(
+            model_name=config.embeddings['model'],
+            batch_size=config.embeddings['batch_size'],
+            cache=self.cache)
+        # one chunk store behind both indexes: a chunk id means the same
+        # chunk in FAISS and BM25 results (the sqlite BM25 backend keeps
+        # its chunks in its own database)
+        self.chunks = ChunkStore(config.paths["chunk_store"])
+        self.store = FaissStore(
+            dim=config.embeddings['dim'], index_dir=config.paths['faiss_dir'], chunks=self.chunks)
+        self.bm25 = open_bm25_store(self.chunks)
+        self.registry = DocRegistry()
+
+        if self.bm25.exists():
+            self.bm25.load()
+
+        # near-duplicate signatures of the indexed chunks ("faiss", "bm25"),
+        # seeded by the first run and kept up to date by the next ones
+        self.dedupers = {}
+
+    def reset(self):
+        self.store.reset()
+        self.bm25.reset()
+        self.chunks.reset()
+        self.registry.clear(save=False)
+        self.dedupers.clear()
+
+    def kind_chunks(self, kind: str):
+        """Store of the chunks of `kind` ("faiss" or "bm25")"""
+        return self.bm25.chunks if kind == "bm25" else self.store.chunks
+
+    def seed_dedupers(self, skip_docs: set):
+        """One deduper per granularity, seeded with the indexed chunks except those of `skip_docs`"""
+        signature_cache = config.dedup["signature_cache"]
+        for name in ("faiss", "bm25"):
+            deduper = self.dedupers[name] = MinHashDeduper(
+                num_perm=config.dedup["num_perm"],
+                bands=config.dedup["bands"],
+                threshold=config.dedup["threshold"],
+                shingle_size=config.dedup["shingle_size"])
+            if signature_cache:
+                deduper.load_signatures(f"{signature_cache}.{name}.npz")
+            n = seed_deduper(deduper, self.kind_chunks(name), name, skip_docs)
+            logger.info(f"[DEDUP] {name}: {n} indexed chunks loaded")
+
+    def save_signatures(self):
+        signature_cache = config.dedup["signature_cache"]
+        if signature_cache:
+            for name, deduper in self.dedupers.items():
+                deduper.save_signatures(f"{signature_cache}.{name}.npz")
+
+
+def ingest_directory(
+    root_folder='data/raw/1c-data', #config.paths['data_dir']
+    full: bool = False,
+    benchmark: str | None = None,
+    compare: str | None = None,
+    paths: list | None = None,
+    context: IngestContext | None = None,
+):
+    """
+    Index the directory into FAISS and BM25.
+
+    By default the run is incremental: files whose size and mtime (or, failing
+    that, content hash) match the registry are skipped, changed files have their old chunks replaced and files
+    deleted from disk are purged from both stores.
+
+    Stores and registry are flushed every `checkpoint_every_docs` documents
+    or `checkpoint_every_sec` seconds, guarded by a write-ahead journal. After
+    a crash, rerunning the same command resumes from the last checkpoint.
+
+    :param root_folder: Directory with the raw documents
+    :param full: Drop the existing indexes and rebuild from scratch
+    :param benchmark: Write a JSON throughput report to this path
+    :param compare: Previous report to compare this run against
+    :param paths: Only look at these files (watch mode); those that no longer
+                  exist are purged
+    :param context: Loaded model and stores to reuse, a new one by default
+    """
+    root = Path(root_folder)
+
+    if not root.exists():
+        logger.error(f"Folder not found: {root}")
+        return
+
+    logger.info(f"Start {'full' if full else 'incremental'} ingest from {root.resolve()}")
+
+    bench = IngestBenchmark()
+
+    ctx = context or IngestContext()
+    cache, embedder = ctx.cache, ctx.embedder
+    store, bm25, registry = ctx.store, ctx.bm25, ctx.registry
+
+    journal = IngestJournal(config.paths["ingest_journal"])
+    previous = journal.recover()
+
+    # Documents whose chunks went to the stores since the last checkpoint
+    touched = set()
+    last_checkpoint = time.monotonic()
+
+    def checkpoint():
+        nonlocal last_checkpoint
+        with bench.timed("save"):
+            journal.begin_checkpoint(touched)
+            # chunks first: the indexes drop ids it no longer has on load
+            ctx.chunks.save()
+            store.save()
+            bm25.save()
+            registry.save()
+            journal.commit_checkpoint(full=full)
+        touched.clear()
+        last_checkpoint = time.monotonic()
+
+    if previous["unfinished"]:
+        # A full rebuild that was interrupted is resumed, not restarted
+        logger.warning(
+            f"Previous {'full' if previous['full'] else 'incremental'} ingest "
+            f"did not finish, resuming from the last checkpoint")
+        full = full or previous["full"]
+        reset = False
+    else:
+        reset = full
+
+    journal.start(full)
+
+    if reset:
+        ctx.reset()
+        # persist the empty state, so a crash from here on resumes this rebuild
+        checkpoint()
+
+    if previous["uncommitted"]:
+        # Interrupted checkpoint: these documents may be in some files and not
+        # in others. Drop them everywhere, they are re-indexed below
+        logger.warning(
+            f"Rolling back {len(previous['uncommitted'])} documents "
+            f"from an interrupted checkpoint")
+        for chunks in chunk_stores(store, bm25):
+            forget_locations(chunks, previous["uncommitted"])
+        store.delete_docs(previous["uncommitted"])
+        bm25.delete_docs(previous["uncommitted"])
+        for doc_id in previous["uncommitted"]:
+            registry.remove(doc_id, save=False)
+        touched |= previous["uncommitted"]
+
+    scope = None
+    with bench.timed("scan"):
+        if paths is None:
+            files = [Path(p) for p in scan_raw_data(root_dir=root_folder)]
+        else:
+            scope = {Path(p).resolve() for p in paths}
+            files = [Path(p) for p in paths if Path(p).exists()]
+    seen_ids = {make_doc_id(p) for p in files}
+
+    with bench.timed("purge"):
+        removed, stale = purge_missing(root, seen_ids, registry, store, bm25, scope)
+    touched |= removed | stale
+
+    counts = bench.counts
+    to_parse = {}
+    unchanged = {}
+    forced = set()
+
+    # Only a stat() per file here: size + mtime equal to the registry means
+    # unchanged. Everything else is hashed inside the parse workers, and
+    # parsed only if the hash differs from the registered one
     for path in files:
-        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError as e:
+            logger.warning(f"Skip unreadable path: {path} ({e})")
+            continue
 
         if not path.is_file():
             logger.warning(f"Skip non-file path: {path}")
             continue
 
-        logger.info(f"Processing: {path}")
-        indexed_files += 1
-
-        doc_id = str(uuid.uuid5(
-            uuid.NAMESPACE_URL,
-            str(Path(path).resolve())))
-        doc_hash = file_hash(path)
-        # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-        # try:
-        #     pages = parse_document(path)
-        #     logger.info(
-        #             f"[DEBUG] Parsed pages: {len(pages)} | "
-        #             f"type={type(pages)} | "
-        #             f"sample={pages[0].keys() if pages and isinstance(pages[0], dict) else pages[:1]}")
-        # except Exception as e:
-        #     logger.error(f"Failed to parse {path}: {e}")
-        #     continue
-
-    #     if registry.exists(doc_id, doc_hash):
-    #         logger.info(f"SKIP unchanged document: {path}")
-    #         continue
-    #     else:
-            # Парсинг
-        try:
-            pages = parse_document(path)
-
-            logger.info(
-                    f"[DEBUG] Parsed pages: {len(pages)} | "
-                    f"type={type(pages)} | "
-                    f"sample={pages[0].keys() if pages and isinstance(pages[0], dict) else pages[:1]}")
-        except Exception as e:
-                logger.error(f"Failed to parse {path}: {e}")
-                continue
-
-        if not pages:
-                logger.warning(f"No content parsed: {path}")
-                continue
-
-            # Фильтрация страниц
-        pages = filter_content_pages(pages)
-        if not pages:
-                logger.warning(f"No content pages after filtering: {path}")
-                continue
-
-            # Чанкинг
-            #chunks = progress_document(pages)
-        # chunks = chunk_document_by_paragraphs(pages, max_tokens=600)
-        faiss_chunks, _ = chunk_document(pages)
-        bm25_chunks =  chunk_document_for_bm25(pages)
-
-        if not faiss_chunks and not bm25_chunks:
-            logger.warning(f"No chunks after chunking & cleaning: {path}")
+        doc_id = make_doc_id(path)
+
+        if registry.unchanged_stat(doc_id, st):
+            unchanged[doc_id] = path
             continue
 
-        log_chunk_stats("FAISS", faiss_chunks)
-        log_chunk_stats("BM25", bm25_chunks)
-
-        if faiss_chunks:
-            faiss_ids = []
-            faiss_texts = []
-            faiss_metadatas = []
-
-            for c in faiss_chunks:
-                faiss_ids.append(str(uuid.uuid4()))
-                faiss_texts.append(c["text"])
-                faiss_metadatas.append({
-                    "doc_id": doc_id,
-                    "path": c["path"],
-                    "file_type": c["file_type"],
-                    "sheet": c["sheet"],
-                    "page": c["page"],
-                    "section": c["section"],
-                    "chunk_id": c["chunk_id"],
-                    "type": c["type"],
-                })
-
-            embeddings = embedder.embed(faiss_texts)
-
-            store.add(
-                ids=faiss_ids,
-                embeddings=embeddings,
-                texts=faiss_texts,
-                metadatas=faiss_metadatas)
-            
-        if bm25_chunks:
-            bm25_texts = []
-            bm25_metadatas = []
-
-            for c in bm25_chunks:
-                bm25_texts.append(c["text"])
-                bm25_metadatas.append({
-                    "doc_id": doc_id,
-                    "path": c["path"],
-                    "file_type": c["file_type"],
-                    "sheet": c["sheet"],
-                    "page": c["page"],
-                    "section": c["section"],
-                    "chunk_id": c["chunk_id"],
-                    "type": c["type"]})
-
-            bm25.add(
-                texts=bm25_texts,
-                metadatas=bm25_metadatas)
-
-        # faiss_texts = [c["text"] for c in faiss_chunks]
-        # bm25_texts  = [c["text"] for c in bm25_chunks]
-
-        
-        # lengths = [len(c["text"].split()) for c in chunks]
-
-        # if not lengths:
-        #     logger.warning(
-        #         f"No chunks after chunking & cleaning: {path}"
-        #     )
-        #     continue
-
-        # logger.info(
-        #     f"Chunks stats: count={len(lengths)}, "
-        #     f"avg_words={sum(lengths) // len(lengths)}, "
-        #     f"min={min(lengths)}, max={max(lengths)}")
-
-        # if not chunks:
-        #     logger.warning(f"No returned chunks: path {path}")
-        #     continue
-            
-        # ids = []
-        # texts = []
-        # metadatas = []
-
-        # for c in chunks:
-        #     uid = str(uuid.uuid4())
-        #     ids.append(uid)
-        #     texts.append(c["text"])
-        #     metadatas.append({
-        #             "doc_id": doc_id,
-        #             "path": c["path"],
-        #             "file_type": c["file_type"],
-        #             "sheet": c["sheet"],
-        #             "page": c["page"],
-        #             "section": c["section"],
-        #             "chunk_id": c["chunk_id"],
-        #             "type": c["type"],})
-
-        # embeddings = embedder.embed(texts)
-
-        # store.add(
-        #         ids=ids,
-        #         embeddings=embeddings,
-        #         texts=texts,
-        #         metadatas=metadatas,
-        #     )
-
-        # bm25.add(
-        #         texts=texts,
-        #         metadatas=metadatas)
-            
-        #     # registry.register(
-        #     #     doc_id,
-        #     #     {
-        #     #         "hash": doc_hash,
-        #     #         "path": str(path),
-        #     #         "file_type": Path(path).suffix,
-        #     #         "updated_at": time.time(),
-        #     #     }
-        #     # )
-
-        # total_chunks += len(texts)
-        total_chunks += len(faiss_chunks) + len(bm25_chunks)
-
-    store.save()
-    bm25.save("data/bm25_index.pkl")
+        to_parse[path] = (doc_id, st)
+
+    # A document whose near-duplicate chunks were dropped in favour of chunks
+    # of another document must be re-indexed when that document changes or
+    # goes away, otherwise its content silently disappears from the index
+    changing = {doc_id for doc_id, _ in to_parse.values()} | removed | stale | previous["uncommitted"]
+    while True:
+        dependents = {
+            doc_id for doc_id, info in registry.docs.items()
+            if doc_id not in changing
+            and changing.intersection(info.get("depends_on", ()))
+        }
+        if not dependents:
+            break
+        for doc_id in dependents:
+            # may be outside `paths` in watch mode, so take it from the registry
+            path = unchanged.pop(doc_id, None) or Path(registry.get(doc_id)["path"])
+            if path.is_file():
+                to_parse[path] = (doc_id, path.stat())
+                forced.add(path)
+        changing |= dependents
+
+    if forced:
+        logger.info(f"Re-indexing {len(forced)} documents that share deduplicated chunks")
+
+    counts["unchanged"] += len(unchanged)
+
+    # parse + chunk (process pool) -> dedup -> embed -> index, each stage in its own
+    # thread with bounded queues in between, so parsing file N+1 overlaps
+    # with embedding file N and a slow stage throttles the ones before it
+
+    # One signature index per granularity, shared by all documents of the
+    # run and holding the chunks indexed before, except those of the
+    # documents that change now. A context that already has them (watch
+    # mode) only drops those documents instead of seeding from every stored
+    # chunk. Documents that turn out unchanged (same hash) or are not
+    # indexed keep their stored chunks, which go back in (restore_dedup)
+    dedupers = ctx.dedupers
+    if config.dedup["enabled"]:
+        with bench.timed("dedup_seed"):
+            if dedupers:
+                for name, deduper in dedupers.items():
+                    n = deduper.discard(changing)
+                    logger.debug(f"[DEDUP] {name}: {n} chunks of changed documents dropped")
+            else:
+                ctx.seed_dedupers(changing)
+
+    def restore_dedup(doc_id):
+        # the chunks this document still has in the stores
+        for name, deduper in dedupers.items():
+            seed_deduper(deduper, ctx.kind_chunks(name), name, docs=[doc_id])
+
+    # Documents deduplicated but not indexed (embedding failed); the embed
+    # thread appends, the dedup thread or, after the pipeline, this one pops
+    not_indexed = []
+
+    def discard_not_indexed():
+        while not_indexed:
+            doc_id = not_indexed.pop()
+            for deduper in dedupers.values():
+                deduper.discard([doc_id])
+            restore_dedup(doc_id)
+
+    def dedup_stage(parsed):
+        discard_not_indexed()
+
+        path, doc_hash, chunked, error = parsed
+        doc_id, st = to_parse[path]
+        if error is not None:
+            counts["failed"] += 1
+            restore_dedup(doc_id)
+            return []
+
+        doc = {
+            "path": path,
+            "doc_id": doc_id,
+            "hash": doc_hash,
+            "stat": st,
+            "touch_only": chunked is None,
+            "faiss_chunks": [],
+            "bm25_chunks": [],
+        }
+
+        if doc["touch_only"]:
+            # Touched but same content: only the stat in the registry is refreshed
+            logger.debug(f"SKIP unchanged content: {path}")
+            restore_dedup(doc_id)
+            return [doc]
+
+        if not chunked["complete"]:
+            # Not registered, so the next run retries it; the chunks of the
+            # previous version (if any) stay in the stores
+            logger.error(f"Parsing failed or incomplete, document not indexed: {path}")
+            counts["failed"] += 1
+            restore_dedup(doc_id)
+            return []
 
+        logger.info(f"Processing: {path}")
+        counts["pages"] += chunked["pages"]
+        faiss_chunks, bm25_chunks = check_chunks(path, chunked)
+
+        # Only computed here: the stores are written by the index stage
+        # alone (the single writer), see index_stage
+        previous_info = registry.get(doc_id)
+        doc["forget"] = previous_info.get("depends_on", ()) if previous_info is not None else None
+
+        doc["depends_on"] = set()
+        doc["locations"] = {"faiss": [], "bm25": []}
+        if dedupers:
+            n = len(faiss_chunks) + len(bm25_chunks)
+            faiss_chunks, deps_faiss, doc["locations"]["faiss"] = dedup_chunks(
+                faiss_chunks, doc_id, dedupers["faiss"])
+            bm25_chunks, deps_bm25, doc["locations"]["bm25"] = dedup_chunks(
+                bm25_chunks, doc_id, dedupers["bm25"])
+            doc["depends_on"] = deps_faiss | deps_bm25
+            counts["duplicates"] += n - len(faiss_chunks) - len(bm25_chunks)
+
+        doc["faiss_chunks"], doc["bm25_chunks"] = faiss_chunks, bm25_chunks
+        return [doc]
+
+    # Chunks of many documents are pooled and sent in full, length-sorted
+    # batches; a document moves on once all of its vectors are ready
+    batcher = EmbeddingBatcher(
+        embedder,
+        batch_size=config.embeddings['batch_size'],
+        buffer_batches=config.embeddings['batch_buffer'])
+
+    def embed_done(finished):
+        # documents whose batch failed to encode are not indexed (nor
+        # registered), the next run retries them. Their locations and the
+        # forget of their previous version were never applied (index_stage
+        # does that); their chunks are dropped from the dedupers, by the
+        # thread that owns them (discard_not_indexed)
+        for doc, ex in batcher.take_failed():
+            logger.error(f"Embedding failed, document not indexed: {doc['path']} ({ex})")
+            counts["failed"] += 1
+            not_indexed.append(doc["doc_id"])
+
+        for doc, embeddings in finished:
+            doc["embeddings"] = embeddings
+            counts["embeddings"] += len(doc["faiss_chunks"])
+        return [doc for doc, _ in finished]
+
+    def embed_stage(doc):
+        texts = [c["text"] for c in doc["faiss_chunks"]]
+        return embed_done(batcher.add(doc, texts))
+
+    def embed_flush():
+        return embed_done(batcher.flush())
+
+    def index_stage(doc):
+        doc_id, path, st = doc["doc_id"], doc["path"], doc["stat"]
+
+        if doc["touch_only"]:
+            info = dict(registry.get(doc_id), size=st.st_size, mtime_ns=st.st_mtime_ns)
+            registry.register(doc_id, info, save=False)
+            counts["unchanged"] += 1
+            return [doc_id]
+
+        with bench.timed("index_add"):
+            if doc["forget"] is not None:
+                # locations of the old version on chunks of other documents,
+                # before those of the new version are added
+                for chunks in chunk_stores(store, bm25):
+                    forget_locations(chunks, {doc_id}, doc["forget"])
+
+            if registry.get(doc_id) is not None:
+                logger.info(f"Replacing changed document: {path}")
+                store.delete_docs([doc_id])
+                bm25.delete_docs([doc_id])
+                counts["replaced"] += 1
+
+            index_chunks(
+                doc_id, doc["faiss_chunks"], doc["embeddings"], doc["bm25_chunks"],
+                store, bm25)
+
+            for kind, chunks in (("faiss", store.chunks), ("bm25", bm25.chunks)):
+                for record, location in doc["locations"][kind]:
+                    add_location(chunks, record, location)
+
+        # Registry is persisted only after the stores (see checkpoint), so a
+        # crash never marks a document as indexed when its chunks are not on disk
+        registry.register(
+            doc_id,
+            {
+                "hash": doc["hash"],
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "path": str(path),
+                "file_type": path.suffix,
+                "updated_at": time.time(),
+                "faiss_chunks": len(doc["faiss_chunks"]),
+                "bm25_chunks": len(doc["bm25_chunks"]),
+                "depends_on": sorted(doc["depends_on"]),
+            },
+            save=False,
+        )
+
+        counts["indexed"] += 1
+        counts["files"] += 1
+        counts["chunks"] += len(doc["faiss_chunks"]) + len(doc["bm25_chunks"])
+
+        touched.add(doc_id)
+        journal.indexed(doc_id)
+
+        if (
+            len(touched) >= config.ingest["checkpoint_every_docs"]
+            or time.monotonic() - last_checkpoint >= config.ingest["checkpoint_every_sec"]
+        ):
+            checkpoint()
+
+        return [doc_id]
+
+    parsed = parse_documents_parallel(
+        to_parse,
+        workers=config.ingest["parse_workers"],
+        max_in_flight=config.ingest["parse_max_in_flight"],
+        pdf_pages_per_task=config.ingest["pdf_pages_per_task"],
+        parse_cache_dir=config.ingest["parse_cache_dir"] or None,
+        known_hashes={
+            path: registry.get(doc_id)["hash"]
+            for path, (doc_id, _) in to_parse.items()
+            if registry.get(doc_id) is not None and path not in forced
+        })
+
+    stats = run_pipeline(
+        parsed,
+        [
+            ("dedup", dedup_stage),
+            ("embed", embed_stage, embed_flush),
+            ("index", index_stage),
+        ],
+        source_name="parse",
+        queue_size=config.ingest["queue_size"])
+    discard_not_indexed()
+
+    checkpoint()
+    journal.finish()
+    if cache is not None:
+        cache.flush()
+
+    log_stage_stats(stats)
+    batcher.log_stats()
+    for name, deduper in dedupers.items():
+        deduper.log_stats(name)
+    if context is None:
+        # a context kept alive saves them when its owner is done (watch mode)
+        ctx.save_signatures()
+    counts["embeddings_computed"] = batcher.texts
 
     logger.success(
-        f"Done. Files: {indexed_files}, chunks: {total_chunks}"
+        f"Done. Files: {counts['indexed']} (replaced {counts['replaced']}), "
+        f"unchanged: {counts['unchanged']}, removed: {len(removed)}, "
+        f"failed: {counts['failed']}, chunks: {counts['chunks']}"
     )
 
+    bench.finish(stats)
+    if benchmark:
+        report = bench.write(benchmark)
+        if compare:
+            compare_reports(report, load_report(compare))
+
 
 if __name__ == "__main__":
-    ingest_directory()
+    parser = argparse.ArgumentParser(description="Index documents into FAISS and BM25")
+    parser.add_argument("--root", default="data/raw/1c-data", help="Directory with raw documents")
+    parser.add_argument("--full", action="store_true", help="Rebuild the indexes from scratch")
+    parser.add_argument("--benchmark", metavar="REPORT.json", help="Write a per-stage throughput report")
+    parser.add_argument("--compare", metavar="PREVIOUS.json", help="Compare the report with a previous one")
+    args = parser.parse_args()
+
+    if args.compare and not args.benchmark:
+        parser.error("--compare requires --benchmark")
+
+    ingest_directory(args.root, full=args.full, benchmark=args.benchmark, compare=args.compare)
@@ -0,0 +1,200 @@
+import queue
+import threading
+from time import perf_counter
+from typing import Callable, Iterable
+
+from loguru import logger
+
+
+# Marks the end of the stream in a queue
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+
+        self.busy = 0.0      # doing work
+        self.starved = 0.0   # waiting for input
+        self.blocked = 0.0   # waiting for room downstream (backpressure)
+
+        self.started = None
+        self.finished = None
+
+    @property
+    def wall(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or perf_counter()) - self.started
+
+    @property
+    def utilisation(self) -> float:
+        return self.busy / self.wall if self.wall else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "wall_sec": round(self.wall, 3),
+            "busy_sec": round(self.busy, 3),
+            "starved_sec": round(self.starved, 3),
+            "blocked_sec": round(self.blocked, 3),
+            "utilisation": round(self.utilisation, 3),
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.name:<8} util={self.utilisation:6.1%} "
+            f"busy={self.busy:8.2f}s starved={self.starved:8.2f}s "
+            f"blocked={self.blocked:8.2f}s in={self.items_in} "
+            f"out={self.items_out} errors={self.errors}"
+        )
+
+
+class _StageThread(threading.Thread):
+    def __init__(self, name: str, outbox: queue.Queue | None):
+        super().__init__(name=f"ingest-{name}", daemon=True)
+        self.stats = StageStats(name)
+        self.outbox = outbox
+
+    def _emit(self, items: Iterable | None):
+        if not items:
+            return
+        for item in items:
+            self.stats.items_out += 1
+            if self.outbox is None:
+                continue
+            t0 = perf_counter()
+            self.outbox.put(item)
+            self.stats.blocked += perf_counter() - t0
+
+    def _close(self):
+        if self.outbox is not None:
+            self.outbox.put(_DONE)
+        self.stats.finished = perf_counter()
+
+
+class SourceStage(_StageThread):
+    """Pulls items from an iterator (time spent in next() counts as busy)"""
+
+    def __init__(self, name: str, source: Iterable, outbox: queue.Queue):
+        super().__init__(name, outbox)
+        self.source = source
+
+    def run(self):
+        self.stats.started = perf_counter()
+        it = iter(self.source)
+
+        try:
+            while True:
+                t0 = perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    self.stats.busy += perf_counter() - t0
+
+                self.stats.items_in += 1
+                self._emit([item])
+        except Exception as ex:
+            self.stats.errors += 1
+            logger.exception(f"[{self.stats.name}] source failed: {ex}")
+        finally:
+            self._close()
+
+
+class Stage(_StageThread):
+    """
+    Takes items from `inbox`, passes each one to `fn` and puts everything
+    `fn` returns into `outbox`. `flush` is called once at the end of the
+    stream for stages that hold items back (batching).
+
+    An exception in `fn` drops that item only; the stream goes on.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[object], Iterable | None],
+        inbox: queue.Queue,
+        outbox: queue.Queue | None,
+        flush: Callable[[], Iterable | None] | None = None,
+    ):
+        super().__init__(name, outbox)
+        self.fn = fn
+        self.flush = flush
+        self.inbox = inbox
+
+    def _call(self, fn, *args):
+        t0 = perf_counter()
+        try:
+            return fn(*args)
+        except Exception as ex:
+            self.stats.errors += 1
+            logger.exception(f"[{self.stats.name}] failed: {ex}")
+            return None
+        finally:
+            self.stats.busy += perf_counter() - t0
+
+    def run(self):
+        self.stats.started = perf_counter()
+
+        try:
+            while True:
+                t0 = perf_counter()
+                item = self.inbox.get()
+                self.stats.starved += perf_counter() - t0
+
+                if item is _DONE:
+                    break
+
+                self.stats.items_in += 1
+                self._emit(self._call(self.fn, item))
+
+            if self.flush is not None:
+                self._emit(self._call(self.flush))
+        finally:
+            self._close()
+
+
+def run_pipeline(
+    source: Iterable,
+    stages: list,
+    source_name: str = "source",
+    queue_size: int = 8,
+) -> list[StageStats]:
+    """
+    Run `source -> stage_1 -> ... -> stage_n`, every stage in its own thread,
+    connected by bounded queues. A full queue blocks the upstream stage, so
+    at most `queue_size` items wait between any two stages.
+
+    :param source: Iterable that feeds the first stage
+    :param stages: List of (name, fn) or (name, fn, flush)
+    :param queue_size: Capacity of each queue between stages
+    :return: Stats of the source and of every stage, in pipeline order
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    threads = [SourceStage(source_name, source, queues[0])]
+    for i, (name, fn, *flush) in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        threads.append(Stage(name, fn, queues[i], outbox, *flush))
+
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return [t.stats for t in threads]
+
+
+def log_stage_stats(stats: list[StageStats]):
+    logger.info("Stage utilisation:")
+    for s in stats:
+        logger.info(f"  {s.summary()}")
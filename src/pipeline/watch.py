@@ -0,0 +1,117 @@
+from pathlib import Path
+from loguru import logger
+import argparse
+import time
+
+from src.parsers.file_scanner import scan_raw_data
+from src.pipeline.ingest import IngestContext, ingest_directory
+
+
+def snapshot(root_folder: str) -> dict:
+    """
+    :return: {resolved path: (size, mtime_ns)} of the supported files under root
+    """
+    snap = {}
+    for p in scan_raw_data(root_dir=root_folder, verbose=False):
+        path = Path(p).resolve()
+        try:
+            st = path.stat()
+        except OSError:
+            # deleted between the scan and the stat
+            continue
+        snap[path] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+def watch_directory(
+    root_folder: str = 'data/raw/1c-data',
+    interval: float = 5.0,
+    debounce: float = 10.0,
+    batch_size: int = 20,
+):
+    """
+    Keep the indexes in sync with the directory.
+
+    Every `interval` seconds the directory is snapshotted (scan + stat, no
+    reads). A file that is new or changed is ingested once its size and mtime
+    have not moved for `debounce` seconds, so copies still in progress are not
+    indexed half-written; deleted files are purged on the next batch. Changes
+    go through ingest_directory(paths=...) in batches of `batch_size`, and the
+    model, stores and dedupers stay loaded between batches, so a batch costs
+    about its own files, not the whole corpus.
+
+    Each batch ends with a checkpoint, so serving processes (RAGPipeline
+    reloads the files when they change) see new documents within
+    interval + debounce + ingest time.
+    """
+    root = Path(root_folder)
+    if not root.exists():
+        logger.error(f"Folder not found: {root}")
+        return
+
+    ctx = IngestContext()
+
+    try:
+        # Snapshot first: a file changed during the catch-up run shows up as a
+        # change on the first round instead of being missed
+        known = snapshot(root_folder)
+
+        # Catch up with whatever changed while the watcher was not running
+        ingest_directory(root_folder, context=ctx)
+
+        pending = {}    # path -> (stat, time the stat was first seen)
+
+        logger.info(
+            f"Watching {root.resolve()} ({len(known)} files, "
+            f"interval={interval}s, debounce={debounce}s)")
+
+        while True:
+            time.sleep(interval)
+            now = time.monotonic()
+            current = snapshot(root_folder)
+
+            for path in current.keys() | known.keys():
+                st = current.get(path)
+                if st == known.get(path):
+                    pending.pop(path, None)
+                    continue
+                if path not in pending or pending[path][0] != st:
+                    # new change, or still being written: restart the debounce
+                    pending[path] = (st, now)
+
+            ready = [p for p, (_, seen) in pending.items() if now - seen >= debounce]
+            if not ready:
+                continue
+
+            logger.info(f"{len(ready)} files changed, {len(pending) - len(ready)} still settling")
+
+            for i in range(0, len(ready), batch_size):
+                batch = ready[i:i + batch_size]
+                try:
+                    ingest_directory(root_folder, paths=batch, context=ctx)
+                except Exception as e:
+                    # retried on the next round, the journal rolls back a torn checkpoint
+                    logger.exception(f"Ingest of {len(batch)} files failed: {e}")
+                    ctx = IngestContext()
+                    continue
+
+                for path in batch:
+                    st, _ = pending.pop(path)
+                    if st is None:
+                        known.pop(path, None)
+                    else:
+                        known[path] = st
+    finally:
+        # the dedupers kept in the context, for the next start
+        ctx.save_signatures()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch a directory and ingest changes continuously")
+    parser.add_argument("--root", default="data/raw/1c-data", help="Directory with raw documents")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between directory scans")
+    parser.add_argument("--debounce", type=float, default=10.0, help="Seconds a file must stay unchanged before it is ingested")
+    parser.add_argument("--batch-size", type=int, default=20, help="Files per ingest batch")
+    args = parser.parse_args()
+
+    watch_directory(args.root, interval=args.interval, debounce=args.debounce, batch_size=args.batch_size)
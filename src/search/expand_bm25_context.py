@@ -3,7 +3,7 @@ from typing import List, Dict, Any
 
 def expand_bm25_context(
     bm25_hits: List[Dict[str, Any]],
-    all_chunks: List[Dict[str, Any]],
+    chunk_store,
     *,
     window_before: int = 3,
     window_after: int = 10,
@@ -11,39 +11,48 @@ def expand_bm25_context(
 ) -> List[Dict[str, Any]]:
     """
     Расширяет BM25-чанки соседним контекстом (внутри одного документа).
+
+    Чанки документа берутся из ChunkStore по doc_id, якорь ищется по
+    глобальному id хита.
     """
 
     expanded_blocks = []
+    doc_cache = {}
 
     for hit in bm25_hits:
         meta = hit["metadata"]
 
+        anchor_id = hit["id"]
         anchor_chunk_id = meta["chunk_id"]
         doc_id = meta["doc_id"]
         path = meta["path"]
         page = meta.get("page")
 
         # 1️⃣ Берём ТОЛЬКО чанки этого документа
-        doc_chunks = [
-            c for c in all_chunks
-            if c["metadata"]["doc_id"] == doc_id
-        ]
+        if doc_id not in doc_cache:
+            doc_chunks = [
+                chunk_store.get(i)
+                for i in chunk_store.ids_of_docs([doc_id], kind="bm25")
+            ]
+
+            # 2️⃣ Сортируем их в естественном порядке документа
+            doc_chunks.sort(
+                key=lambda c: (
+                    c["metadata"].get("page") or 0,
+                    c["metadata"].get("chunk_id", 0),
+                )
+            )
+            doc_cache[doc_id] = doc_chunks
+
+        doc_chunks = doc_cache[doc_id]
 
         if not doc_chunks:
             continue
 
-        # 2️⃣ Сортируем их в естественном порядке документа
-        doc_chunks.sort(
-            key=lambda c: (
-                c["metadata"].get("page", 0),
-                c["metadata"].get("chunk_id", 0),
-            )
-        )
-
         # 3️⃣ Находим позицию якоря
         anchor_pos = None
         for i, c in enumerate(doc_chunks):
-            if c["metadata"]["chunk_id"] == anchor_chunk_id:
+            if c["id"] == anchor_id:
                 anchor_pos = i
                 break
 
@@ -7,6 +7,16 @@ from config.config import Config
 config = Config()
 
 
+def fusion_key(metadata: dict) -> tuple:
+    """Parsed page a chunk comes from: the unit FAISS and BM25 hits are fused on"""
+    return (
+        metadata.get("doc_id"),
+        metadata.get("page"),
+        metadata.get("sheet"),
+        metadata.get("section"),
+    )
+
+
 def hybrid_search(
     query: str,
     query_embedding,
@@ -37,38 +47,46 @@ def hybrid_search(
         "faiss": 0.0,
         "bm25": 0.0,
         "score": 0.0,
+        "id": None,
         "text": None,
         "metadata": None,
     })
 
-    for r in faiss_results:
-        key = r["metadata"]["chunk_id"]
-        combined[key]["faiss"] = r["norm_score"]
-        combined[key]["text"] = r["text"]
-        combined[key]["metadata"] = r["metadata"]
-
+    # FAISS passages and BM25 sentences are different chunks with their own
+    # ids; what they share is the parsed page they were cut from, so the
+    # scores are fused per page (best hit of each side). The FAISS passage
+    # is the result text when there is one, it carries more context
     for r in bm25_results:
-        key = r["metadata"]["chunk_id"]
-        combined[key]["bm25"] = r["norm_score"]
-        combined[key]["text"] = r["text"]
-        combined[key]["metadata"] = r["metadata"]
+        data = combined[fusion_key(r["metadata"])]
+        if data["id"] is None or r["norm_score"] > data["bm25"]:
+            data["bm25"] = r["norm_score"]
+            data["id"], data["text"], data["metadata"] = r["id"], r["text"], r["metadata"]
+
+    faiss_keys = set()
+    for r in faiss_results:
+        key = fusion_key(r["metadata"])
+        data = combined[key]
+        if key not in faiss_keys or r["norm_score"] > data["faiss"]:
+            faiss_keys.add(key)
+            data["faiss"] = r["norm_score"]
+            data["id"], data["text"], data["metadata"] = r["id"], r["text"], r["metadata"]
 
     results = []
 
-    for chunk_id, data in combined.items():
+    for key, data in combined.items():
         final_score = alpha * data["faiss"] + (1 - alpha) * data["bm25"]
         data["score"] = final_score
 
         if debug:
             logger.debug(
-                f"[HYBRID] chunk={chunk_id} | "
+                f"[HYBRID] chunk={data['id']} page={key[1:]} | "
                 f"faiss={data['faiss']:.3f} | "
                 f"bm25={data['bm25']:.3f} | "
                 f"final={final_score:.3f}"
             )
 
         results.append({
-            "id": data["metadata"].get("id"),
+            "id": data["id"],
             "score": final_score,
             "text": data["text"],
             "metadata": data["metadata"],
@@ -1,10 +1,27 @@
 import hashlib
 
 
+# Large reads keep the number of syscalls low on network shares
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
 def file_hash(path: str) -> str:
-    h = hashlib.sha3_256()
-    with open(path, 'rb') as f:
-        for chunk in iter(lambda: f.read(8192), b''):
-            h.update(chunk)
-    return h.hexdigest()
+    """
+    Content hash of a file.
 
+    BLAKE2b is several times faster than SHA3-256 in hashlib; the file is
+    streamed through one reusable 1 MiB buffer with readinto, so no new
+    bytes objects are allocated per block.
+    """
+    h = hashlib.blake2b(digest_size=32)
+    buf = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+
+    return h.hexdigest()
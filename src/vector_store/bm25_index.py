@@ -0,0 +1,646 @@
+import json
+import math
+import os
+import shutil
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List
+
+import numpy as np
+
+
+# On-disk format (BM25Index.save); bump when the files change
+FORMAT = "bm25-index"
+FORMAT_VERSION = 1
+
+# Arrays written as .npy files. The ones in MMAP_ARRAYS are memory-mapped
+# read-only on load (never changed in place, shared between processes
+# through the page cache); the rest are read into memory
+SAVED_ARRAYS = (
+    "df", "doc_len", "doc_ids",
+    "ptr", "post_docs", "post_tfs",
+    "bound_ptr", "bound_tf", "bound_dl",
+)
+MMAP_ARRAYS = ("ptr", "post_docs", "post_tfs", "bound_ptr", "bound_tf", "bound_dl")
+
+# Tail postings are merged into the base arrays once they outgrow them, so
+# every posting is copied O(1) times on average
+MERGE_MIN_POSTINGS = 1 << 16
+
+# Query postings are summed into a dense per-row array instead of being
+# sorted once they reach 1/DENSE_ACCUMULATE_RATIO of the rows
+DENSE_ACCUMULATE_RATIO = 8
+
+# MaxScore sets its first threshold by scoring SEED_PER_K * k documents in
+# full, picked by their scores on the shortest query postings (up to
+# 1/SEED_POSTINGS_SHARE of all)
+SEED_PER_K = 4
+SEED_POSTINGS_SHARE = 8
+
+# Below this many query postings MaxScore costs more than it skips
+MAXSCORE_MIN_POSTINGS = 1 << 14
+
+
+def _bound_points(tfs: np.ndarray, lengths: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Each tf value with the shortest document length seen with it"""
+    order = np.lexsort((lengths, tfs))
+    tfs, lengths = tfs[order], lengths[order]
+    first = np.ones(len(tfs), dtype=bool)
+    first[1:] = tfs[1:] != tfs[:-1]
+    return tfs[first], lengths[first]
+
+
+def _reserve(arr: np.ndarray, n: int) -> np.ndarray:
+    """`arr` with room for at least n items (capacity doubles)"""
+    if n <= len(arr):
+        return arr
+    grown = np.zeros(max(n, 2 * len(arr)), dtype=arr.dtype)
+    grown[:len(arr)] = arr
+    return grown
+
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring.
+
+    Documents are rows numbered in insertion order and carry an external id
+    (the ChunkStore chunk id). Postings of each term are (row, tf) pairs:
+
+    - base: CSR arrays over all terms (ptr, docs, tfs), sorted by term, then row;
+    - tail: per-term `array` buffers of the rows added since the last merge.
+
+    Adding a document touches only its own terms, plus a merge of the tail
+    into the base when the tail gets as large as the base (amortised O(1)
+    per posting). Document frequencies, lengths and the total length are
+    kept up to date as documents come and go.
+
+    Deleted rows are marked dead right away (statistics updated) and their
+    postings are dropped at the next merge.
+
+    idf = log(1 + (N - df + 0.5) / (df + 0.5)), which stays positive for
+    terms found in most of the documents.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self.vocab = {}                                 # term -> term id
+        self.df = np.zeros(0, dtype=np.int64)           # by term id
+
+        self.n_rows = 0
+        self.n_docs = 0                                 # alive rows
+        self.total_len = 0
+        self.doc_len = np.zeros(0, dtype=np.int32)      # by row
+        self.alive = np.zeros(0, dtype=bool)
+        self.doc_ids = np.zeros(0, dtype=np.int64)      # row -> external id
+        self._row_of = {}                               # external id -> row, built lazily
+        self.n_dead = 0
+
+        self.ptr = np.zeros(1, dtype=np.int64)
+        self.post_docs = np.zeros(0, dtype=np.int32)
+        self.post_tfs = np.zeros(0, dtype=np.int32)
+        # per base term (CSR by bound_ptr): each tf value of its postings
+        # with the shortest document length seen with it (see _bound)
+        self.bound_ptr = np.zeros(1, dtype=np.int64)
+        self.bound_tf = np.zeros(0, dtype=np.int32)
+        self.bound_dl = np.zeros(0, dtype=np.int32)
+        # the same for tail postings, filled by queries:
+        # term id -> (tail postings covered, tfs, lengths)
+        self.tail_bounds = {}
+
+        self._norms = None                              # per-row norms, reset by every change
+
+        self.tail = {}                                  # term id -> (rows, tfs)
+        self.tail_terms = {}                            # tail row -> its term ids
+        self.tail_size = 0
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def row_of(self) -> dict:
+        """External id -> row (built on first use after a load or merge)"""
+        if self._row_of is None:
+            alive = self.alive[:self.n_rows]
+            rows = np.flatnonzero(alive).tolist()
+            self._row_of = dict(zip(self.doc_ids[:self.n_rows][alive].tolist(), rows))
+        return self._row_of
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def add(self, ids: Iterable[int], token_lists: Iterable[List[str]]):
+        """Index documents given as token lists under external `ids`"""
+        row_of = self.row_of
+        self._norms = None
+        for doc_id, tokens in zip(ids, token_lists):
+            doc_id = int(doc_id)
+            if doc_id in row_of:
+                raise ValueError(f"Document {doc_id} is already indexed")
+
+            row = self.n_rows
+            self.n_rows += 1
+
+            self.doc_len = _reserve(self.doc_len, self.n_rows)
+            self.alive = _reserve(self.alive, self.n_rows)
+            self.doc_ids = _reserve(self.doc_ids, self.n_rows)
+            self.doc_len[row] = len(tokens)
+            self.alive[row] = True
+            self.doc_ids[row] = doc_id
+            row_of[doc_id] = row
+
+            self.n_docs += 1
+            self.total_len += len(tokens)
+
+            terms = self.tail_terms[row] = array("i")
+
+            for term, tf in Counter(tokens).items():
+                t = self.vocab.get(term)
+                if t is None:
+                    t = self.vocab[term] = len(self.vocab)
+                    self.df = _reserve(self.df, len(self.vocab))
+
+                self.df[t] += 1
+                terms.append(t)
+
+                postings = self.tail.get(t)
+                if postings is None:
+                    postings = self.tail[t] = (array("i"), array("i"))
+                postings[0].append(row)
+                postings[1].append(tf)
+                self.tail_size += 1
+
+        if self.tail_size > max(MERGE_MIN_POSTINGS, len(self.post_docs)):
+            self._merge()
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """Remove documents by external id; unknown ids are ignored"""
+        row_of = self.row_of
+        rows = [row_of.pop(int(i)) for i in ids if int(i) in row_of]
+        if not rows:
+            return 0
+        self._norms = None
+
+        rows = np.array(rows, dtype=np.int64)
+        dead = np.zeros(self.n_rows, dtype=bool)
+        dead[rows] = True
+
+        # document frequencies: terms of tail rows are at hand, those of
+        # base rows are found among the base postings
+        base = []
+        for row in rows.tolist():
+            terms = self.tail_terms.get(row)
+            if terms is None:
+                base.append(row)
+            else:
+                self.df[np.array(terms, dtype=np.int64)] -= 1
+
+        if base:
+            hit = dead[self.post_docs]
+            terms = np.repeat(np.arange(len(self.ptr) - 1), np.diff(self.ptr))[hit]
+            self.df[:len(self.ptr) - 1] -= np.bincount(terms, minlength=len(self.ptr) - 1)
+
+        self.alive[rows] = False
+        self.n_docs -= len(rows)
+        self.n_dead += len(rows)
+        self.total_len -= int(self.doc_len[rows].sum())
+
+        if self.n_dead > self.n_rows // 4:
+            self._merge()
+
+        return len(rows)
+
+    def _merge(self):
+        """Fold the tail into the base, drop postings and rows of deleted documents"""
+        n_terms = len(self.vocab)
+        n_base_terms = len(self.ptr) - 1
+
+        terms = [np.repeat(np.arange(n_base_terms), np.diff(self.ptr))]
+        docs = [self.post_docs]
+        tfs = [self.post_tfs]
+        for t, (d, f) in self.tail.items():
+            terms.append(np.full(len(d), t))
+            docs.append(np.array(d, dtype=np.int32))
+            tfs.append(np.array(f, dtype=np.int32))
+
+        terms = np.concatenate(terms)
+        docs = np.concatenate(docs)
+        tfs = np.concatenate(tfs)
+
+        if self.n_dead:
+            keep = self.alive[docs]
+            terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+
+            # renumber rows without the dead ones
+            alive = self.alive[:self.n_rows]
+            new_row = np.cumsum(alive) - 1
+            docs = new_row[docs].astype(np.int32)
+
+            self.doc_len = self.doc_len[:self.n_rows][alive]
+            self.doc_ids = self.doc_ids[:self.n_rows][alive]
+            self.n_rows = len(self.doc_ids)
+            self.alive = np.ones(self.n_rows, dtype=bool)
+            self._row_of = None
+            self.n_dead = 0
+
+        # rows grow within each term (base rows precede tail rows), a stable
+        # sort by term keeps them in order
+        order = np.argsort(terms, kind="stable")
+        self.post_docs = docs[order]
+        self.post_tfs = tfs[order]
+
+        self.ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=self.ptr[1:])
+
+        # the contribution of a term grows with tf and falls with document
+        # length: whatever avgdl is, its maximum over the postings is at
+        # one of the (tf, shortest length with that tf) points
+        terms = terms[order]
+        lengths = self.doc_len[self.post_docs]
+        by_point = np.lexsort((lengths, self.post_tfs, terms))
+        terms, tfs, lengths = terms[by_point], self.post_tfs[by_point], lengths[by_point]
+        first = np.ones(len(terms), dtype=bool)
+        first[1:] = (terms[1:] != terms[:-1]) | (tfs[1:] != tfs[:-1])
+
+        self.bound_tf, self.bound_dl = tfs[first], lengths[first]
+        self.bound_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms[first], minlength=n_terms), out=self.bound_ptr[1:])
+
+        self.tail = {}
+        self.tail_terms = {}
+        self.tail_bounds = {}
+        self.tail_size = 0
+        self._norms = None
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str):
+        """
+        Write the index as a directory of .npy arrays plus meta.json.
+
+        The tail is merged and deleted rows dropped first, so only the
+        base arrays are written. Each save goes to a new generation
+        directory; the CURRENT file is switched to it atomically at the
+        end and older generations are removed (a process that still maps
+        them keeps reading its files until it reloads).
+        """
+        if self.tail or self.n_dead:
+            self._merge()
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        generation = f"{time.time_ns():x}"
+        tmp = path / f"{generation}.tmp"
+        tmp.mkdir()
+
+        # growable arrays have spare capacity at the end
+        used = {"df": len(self.vocab), "doc_len": self.n_rows, "doc_ids": self.n_rows}
+        for name in SAVED_ARRAYS:
+            arr = getattr(self, name)
+            if name in used:
+                arr = arr[:used[name]]
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+
+        # terms in id order, one per line (tokens never contain whitespace)
+        vocab = "\n".join(self.vocab).encode("utf-8")
+        np.save(tmp / "vocab.npy", np.frombuffer(vocab, dtype=np.uint8))
+
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "format": FORMAT,
+                "version": FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "n_terms": len(self.vocab),
+                "n_docs": self.n_docs,
+                "total_len": self.total_len,
+            }, f)
+
+        os.replace(tmp, path / generation)
+
+        current_tmp = path / "CURRENT.tmp"
+        current_tmp.write_text(generation, encoding="utf-8")
+        os.replace(current_tmp, path / "CURRENT")
+
+        for old in path.iterdir():
+            if old.is_dir() and old.name != generation:
+                shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return (Path(path) / "CURRENT").exists()
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Open an index written by save: the postings are memory-mapped, the
+        vocabulary and per-document arrays read; nothing is re-tokenized.
+
+        :raises ValueError: Not an index of this format version
+        """
+        path = Path(path)
+        directory = path / (path / "CURRENT").read_text(encoding="utf-8").strip()
+
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT or meta.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported BM25 index format {meta.get('format')} v{meta.get('version')} in {directory}")
+
+        index = cls(k1=meta["k1"], b=meta["b"])
+
+        for name in SAVED_ARRAYS:
+            file = directory / f"{name}.npy"
+            if name in MMAP_ARRAYS:
+                try:
+                    arr = np.load(file, mmap_mode="r")
+                except ValueError:
+                    # empty arrays can not be mapped
+                    arr = np.load(file)
+            else:
+                arr = np.load(file)
+            setattr(index, name, arr)
+
+        vocab = np.load(directory / "vocab.npy").tobytes().decode("utf-8")
+        terms = vocab.split("\n") if meta["n_terms"] else []
+        index.vocab = dict(zip(terms, range(len(terms))))
+
+        index.n_rows = len(index.doc_ids)
+        index.n_docs = meta["n_docs"]
+        index.total_len = meta["total_len"]
+        index.alive = np.ones(index.n_rows, dtype=bool)
+        index._row_of = None
+
+        return index
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def postings(self, t: int) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, tfs) of term id `t`, deleted rows included"""
+        if t < len(self.ptr) - 1:
+            start, end = self.ptr[t], self.ptr[t + 1]
+            docs, tfs = self.post_docs[start:end], self.post_tfs[start:end]
+        else:
+            docs = tfs = np.zeros(0, dtype=np.int32)
+
+        tail = self.tail.get(t)
+        if tail is not None:
+            docs = np.concatenate([docs, np.array(tail[0], dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.array(tail[1], dtype=np.int32)])
+
+        return docs, tfs
+
+    def idf(self, t: int) -> float:
+        df = self.df[t]
+        return math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def _query_terms(self, tokens: List[str]) -> list:
+        """
+        (term id, rows, tfs, weight) of the query tokens found in the
+        vocabulary. weight is idf times the number of times the token occurs
+        in the query (a repeated token counts each time, as in rank_bm25).
+        """
+        terms = []
+        for token, n in Counter(tokens).items():
+            t = self.vocab.get(token)
+            if t is not None:
+                docs, tfs = self.postings(t)
+                terms.append((t, docs, tfs, n * self.idf(t)))
+        return terms
+
+    def _norm(self, rows: np.ndarray, avgdl: float) -> np.ndarray:
+        """Length normalisation k1 * (1 - b + b * dl / avgdl) of the rows"""
+        # computed for all rows once after each change of the index (add,
+        # delete and _merge reset it), queries in between only look it up
+        if self._norms is None:
+            self._norms = self.k1 * (1 - self.b + self.b * self.doc_len[:self.n_rows] / avgdl)
+        return self._norms[rows]
+
+    def _contrib(self, tfs: np.ndarray, norm: np.ndarray, weight: float) -> np.ndarray:
+        return weight * tfs * (self.k1 + 1) / (tfs + norm)
+
+    def _accumulate(self, terms: list, avgdl: float) -> tuple[np.ndarray, np.ndarray]:
+        """Exhaustive scores of every alive row in the postings of `terms`"""
+        if not terms:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64)
+
+        docs = np.concatenate([d for _, d, _, _ in terms])
+        contrib = np.concatenate([
+            self._contrib(tfs, self._norm(d, avgdl), weight) for _, d, tfs, weight in terms
+        ])
+
+        if len(terms) == 1:
+            rows, scores = docs, contrib
+        elif len(docs) * DENSE_ACCUMULATE_RATIO >= self.n_rows:
+            # postings cover a good part of the corpus: a dense sum is
+            # cheaper than sorting them
+            acc = np.bincount(docs, weights=contrib, minlength=self.n_rows)
+            rows = np.flatnonzero(acc)
+            scores = acc[rows]
+        else:
+            rows, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=contrib, minlength=len(rows))
+
+        if self.n_dead:
+            keep = self.alive[rows]
+            rows, scores = rows[keep], scores[keep]
+
+        return rows, scores
+
+    def score_docs(self, tokens: List[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 scores of the documents that contain any query token.
+
+        Only the postings of the query terms are read: contributions are
+        summed per row with unique + bincount, so the cost follows the
+        postings length, not the corpus size (for postings about as long
+        as the corpus, a dense bincount is used instead of sorting).
+
+        :return: (rows, scores), deleted rows left out
+        """
+        if not self.n_docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64)
+        return self._accumulate(self._query_terms(tokens), self.total_len / self.n_docs)
+
+    def _bound(self, t: int, docs: np.ndarray, tfs: np.ndarray, weight: float, avgdl: float) -> float:
+        """
+        Upper bound of what term id `t` (postings `docs`, `tfs`, query
+        weight) adds to the score of any document.
+
+        Exact: computed over the (tf, shortest length) points of the
+        postings, kept at merge for the base and extended by each query for
+        the tail. Deleted documents may loosen it until the next merge,
+        never make it too low.
+        """
+        tf_parts, dl_parts = [], []
+        n_base = 0
+        if t < len(self.bound_ptr) - 1:
+            start, end = self.bound_ptr[t], self.bound_ptr[t + 1]
+            tf_parts.append(self.bound_tf[start:end])
+            dl_parts.append(self.bound_dl[start:end])
+            n_base = int(self.ptr[t + 1] - self.ptr[t])
+
+        if len(docs) > n_base:
+            seen, tail_tf, tail_dl = self.tail_bounds.get(t, (0, tfs[:0], tfs[:0]))
+            if n_base + seen < len(docs):
+                tail_tf, tail_dl = _bound_points(
+                    np.concatenate([tail_tf, tfs[n_base + seen:]]),
+                    np.concatenate([tail_dl, self.doc_len[docs[n_base + seen:]]]))
+                self.tail_bounds[t] = (len(docs) - n_base, tail_tf, tail_dl)
+            tf_parts.append(tail_tf)
+            dl_parts.append(tail_dl)
+
+        tf = np.concatenate(tf_parts)
+        if not len(tf):
+            return 0.0
+
+        norm = self.k1 * (1 - self.b + self.b * np.concatenate(dl_parts) / avgdl)
+        return float(self._contrib(tf, norm, weight).max())
+
+    def _score_rows(self, rows: np.ndarray, terms: list, avgdl: float) -> np.ndarray:
+        """
+        Full BM25 scores of the given rows (sorted, unique).
+
+        Postings are sorted by row, so each term is matched against the
+        rows by binary search from the shorter side; long postings lists
+        are probed, not scanned.
+        """
+        norm = self._norm(rows, avgdl)
+        scores = np.zeros(len(rows), dtype=np.float64)
+
+        for _, docs, tfs, weight in terms:
+            if not len(docs) or not len(rows):
+                continue
+
+            if len(docs) < len(rows):
+                pos = np.searchsorted(rows, docs)
+                found = pos < len(rows)
+                found[found] = rows[pos[found]] == docs[found]
+                at, tf = pos[found], tfs[found]
+            else:
+                pos = np.minimum(np.searchsorted(docs, rows), len(docs) - 1)
+                found = docs[pos] == rows
+                at, tf = np.flatnonzero(found), tfs[pos[found]]
+
+            scores[at] += self._contrib(tf, norm[at], weight)
+
+        return scores
+
+    def _kth(self, scores: np.ndarray, k: int) -> float:
+        """k-th best of `scores`, 0 if there are fewer"""
+        if len(scores) < k:
+            return 0.0
+        return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+
+    def _top_k_maxscore(self, tokens: List[str], k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact top-k with MaxScore pruning, term at a time.
+
+        Terms are taken by their score upper bound, highest first. theta is
+        a lower bound of the final k-th best score (the k-th best of scores
+        known so far; contributions are never negative):
+
+        1. The documents that score best on the rarest terms are scored in
+           full for a first theta.
+        2. Essential terms: while the bounds of the remaining terms add up
+           to theta or more, a document missing from the terms seen so far
+           can still reach the top-k, so their postings are summed in full.
+        3. The rest only update the documents found so far: before each
+           term, documents whose partial score plus the bounds of the
+           remaining terms stays below theta are dropped, then the term's
+           postings are probed for the survivors (binary search) and theta
+           is raised.
+
+        Long postings of frequent (low idf) terms mostly come in step 3, so
+        they are searched for a shrinking set of documents, not scanned.
+        Queries with few postings are scored exhaustively, pruning would
+        not pay off.
+
+        :return: (rows, scores) of the documents left, unordered
+        """
+        avgdl = self.total_len / self.n_docs
+
+        terms = self._query_terms(tokens)
+        total = sum(len(docs) for _, docs, _, _ in terms)
+        if total < MAXSCORE_MIN_POSTINGS:
+            return self._accumulate(terms, avgdl)
+
+        bounds = [self._bound(t, docs, tfs, weight, avgdl) for t, docs, tfs, weight in terms]
+        order = sorted(range(len(terms)), key=lambda i: bounds[i], reverse=True)
+        terms = [terms[i] for i in order]
+        # remaining[i]: most that terms i.. can add to a score
+        remaining = np.cumsum([bounds[i] for i in order][::-1])[::-1].tolist() + [0.0]
+
+        # 1. first threshold, from the documents that score best on the
+        # terms with the shortest postings (the partial sums of any terms
+        # only underestimate)
+        theta = 0.0
+        seed, size = [], 0
+        for term in sorted(terms, key=lambda x: len(x[1])):
+            if seed and size + len(term[1]) > total // SEED_POSTINGS_SHARE:
+                break
+            seed.append(term)
+            size += len(term[1])
+
+        rows, partial = self._accumulate(seed, avgdl)
+        if len(rows) >= k:
+            n_seed = min(len(rows), SEED_PER_K * k)
+            best = np.argpartition(-partial, n_seed - 1)[:n_seed]
+            theta = self._kth(self._score_rows(np.sort(rows[best]), terms, avgdl), k)
+
+        # the margin keeps float rounding of bound vs score from dropping a tie
+        margin = 1 - 1e-9
+
+        # 2. essential terms
+        essential = 1
+        while essential < len(terms) and remaining[essential] >= theta * margin:
+            essential += 1
+
+        rows, scores = self._accumulate(terms[:essential], avgdl)
+        if len(rows) > 1:
+            order = np.argsort(rows)
+            rows, scores = rows[order], scores[order]
+        theta = max(theta, self._kth(scores, k))
+
+        # 3. the rest, for the documents that can still make it
+        for i in range(essential, len(terms)):
+            keep = scores + remaining[i] >= theta * margin
+            rows, scores = rows[keep], scores[keep]
+
+            scores = scores + self._score_rows(rows, terms[i:i + 1], avgdl)
+            theta = max(theta, self._kth(scores, k))
+
+        return rows, scores
+
+    def top_k(self, tokens: List[str], k: int, pruning: str = "none") -> tuple[np.ndarray, np.ndarray]:
+        """
+        The k best rows for the query, best first.
+
+        Selection is a partial sort (argpartition) over the scored rows;
+        only the k selected are sorted.
+
+        :param pruning: "none" scores every document of the query postings,
+                        "maxscore" only those that can reach the top-k
+        """
+        if pruning == "maxscore" and self.n_docs and k > 0:
+            rows, scores = self._top_k_maxscore(tokens, k)
+        elif pruning in ("none", "maxscore"):
+            rows, scores = self.score_docs(tokens)
+        else:
+            raise ValueError(f"Unknown BM25 pruning: {pruning}")
+
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[best], scores[best]
+
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
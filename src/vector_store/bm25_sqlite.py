@@ -0,0 +1,332 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+from loguru import logger
+from config.config import Config
+from src.vector_store.bm25_store import bm25_tokenize
+
+
+config = Config()
+
+
+# Tokens come from bm25_tokenize (lowercase [а-яa-z0-9], space separated),
+# unicode61 only splits them on the spaces. Diacritics folding is off: it
+# would map "й" to "и" in the index but not in the query tokens.
+#
+# The FTS5 table is contentless: it keeps the index, not the tokens. A row
+# is deleted by passing its tokens again, rebuilt from chunks.text, so
+# changing bm25_tokenize needs a full re-index (--full).
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS chunks (
+        id       INTEGER PRIMARY KEY AUTOINCREMENT,
+        doc_id   TEXT,
+        text     TEXT NOT NULL,
+        metadata TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks(doc_id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS bm25 USING fts5(
+        tokens,
+        content = '',
+        tokenize = 'unicode61 remove_diacritics 0'
+    )
+    """,
+)
+
+
+def _dumps(metadata: Dict) -> str:
+    return json.dumps(metadata, ensure_ascii=False)
+
+
+class SqliteChunks:
+    """
+    Text and metadata of the BM25 chunks in the SQLite database, with the
+    ChunkStore interface, read by id on demand. Nothing is kept in memory:
+    a metadata dict handed out is a copy, changes go through set_metadata
+    or add_location.
+    """
+
+    kind = "bm25"
+
+    def __init__(self, store: "SqliteBM25Store"):
+        self._store = store
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._store.conn
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def text(self, chunk_id: int) -> str | None:
+        row = self.conn.execute("SELECT text FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        return row[0] if row else None
+
+    def metadata(self, chunk_id: int) -> Dict | None:
+        row = self.conn.execute("SELECT metadata FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, chunk_id: int) -> Dict:
+        row = self.conn.execute("SELECT text, metadata FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        return {
+            "id": int(chunk_id),
+            "text": row[0] if row else None,
+            "metadata": json.loads(row[1]) if row else None,
+        }
+
+    def alive(self, ids: Iterable[int]) -> List[bool]:
+        """Whether each id still points at a chunk"""
+        ids = list(ids)
+        found = {i for (i,) in self.conn.execute(
+            "SELECT id FROM chunks WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))}
+        return [i in found for i in ids]
+
+    def ids_of_docs(self, doc_ids: Iterable, kind: str | None = None) -> List[int]:
+        if kind not in (None, self.kind):
+            return []
+        return [
+            i for doc_id in doc_ids
+            for (i,) in self.conn.execute("SELECT id FROM chunks WHERE doc_id IS ? ORDER BY id", (doc_id,))
+        ]
+
+    def ids_of_kind(self, kind: str) -> List[int]:
+        if kind != self.kind:
+            return []
+        return [i for (i,) in self.conn.execute("SELECT id FROM chunks ORDER BY id")]
+
+    def doc_ids(self, kind: str | None = None) -> set:
+        if kind not in (None, self.kind):
+            return set()
+        return {doc_id for (doc_id,) in self.conn.execute("SELECT DISTINCT doc_id FROM chunks")}
+
+    def iter_kind(
+        self, kind: str, skip_docs: Iterable = (), doc_ids: Iterable | None = None,
+    ) -> Iterator[tuple[int, str, Dict]]:
+        """(id, text, metadata) of the chunks of `kind` (of `doc_ids`, default: all), except those of `skip_docs`"""
+        if kind != self.kind:
+            return
+        skip_docs = set(skip_docs)
+        if doc_ids is None:
+            rows = self.conn.execute("SELECT id, doc_id, text, metadata FROM chunks ORDER BY id")
+        else:
+            rows = self.conn.execute(
+                "SELECT id, doc_id, text, metadata FROM chunks"
+                " WHERE doc_id IN (SELECT value FROM json_each(?)) ORDER BY id",
+                (json.dumps(sorted(set(doc_ids))),)).fetchall()
+        for i, doc_id, text, metadata in rows:
+            if doc_id in skip_docs:
+                continue
+            yield i, text, json.loads(metadata)
+
+    def ids_with_duplicates(self, doc_ids: Iterable | None = None) -> List[int]:
+        """Ids (of the given documents, default: all) with a non-empty "duplicates" list"""
+        sql = "SELECT id FROM chunks WHERE json_array_length(metadata, '$.duplicates') > 0"
+        if doc_ids is None:
+            return [i for (i,) in self.conn.execute(f"{sql} ORDER BY id")]
+
+        # the doc_id index narrows the rows, only those have their JSON parsed
+        return [i for (i,) in self.conn.execute(
+            "SELECT id FROM chunks WHERE doc_id IN (SELECT value FROM json_each(?))"
+            " AND json_array_length(metadata, '$.duplicates') > 0 ORDER BY id",
+            (json.dumps(sorted(set(doc_ids))),))]
+
+    # ------------------------------------------------------------------
+    # Changes (in the store's open transaction)
+    # ------------------------------------------------------------------
+
+    def add(self, texts: List[str], metadatas: List[Dict], kind: str = "bm25") -> np.ndarray:
+        assert len(texts) == len(metadatas) and kind == self.kind
+
+        self._store._write()
+        ids = []
+        for text, meta in zip(texts, metadatas):
+            cur = self.conn.execute(
+                "INSERT INTO chunks(doc_id, text, metadata) VALUES (?, ?, ?)",
+                (meta.get("doc_id"), text, _dumps(meta)))
+            ids.append(cur.lastrowid)
+
+        return np.array(ids, dtype="int64")
+
+    def set_metadata(self, chunk_id: int, metadata: Dict):
+        self._store._write()
+        self.conn.execute("UPDATE chunks SET metadata = ? WHERE id = ?", (_dumps(metadata), chunk_id))
+
+    def add_location(self, chunk_id: int, location: Dict):
+        """Append a near-duplicate's location to the chunk's "duplicates" list"""
+        metadata = self.metadata(chunk_id)
+        metadata.setdefault("duplicates", []).append(location)
+        self.set_metadata(chunk_id, metadata)
+
+    def delete(self, ids: Iterable[int]):
+        self._store._write()
+        self.conn.executemany("DELETE FROM chunks WHERE id = ?", ((i,) for i in ids))
+
+
+class SqliteBM25Store:
+    """
+    BM25 kept on disk in an SQLite database, for deployments that can not
+    hold the inverted index or the chunks in memory.
+
+    Same interface as BM25Store, but the chunks live in the database too
+    (SqliteChunks, `chunks` table), not in the ChunkStore: nothing is read
+    into memory at startup, a query reads the rows it returns. The
+    contentless FTS5 table `bm25` indexes the bm25_tokenize output under the
+    chunk id; ranking is FTS5 bm25() (k1=1.2, b=0.75, so scores differ
+    slightly from BM25Index).
+
+    Changes go into one transaction that save() commits, so the database
+    matches the last ingest checkpoint like the other stores. The database
+    runs in WAL mode: a reading process sees every commit without reloading
+    and never blocks the ingest. Switching bm25_backend needs --full.
+    """
+
+    kind = "bm25"
+
+    def __init__(self, path=config.paths["bm25_sqlite"]):
+        logger.info("Creating SQLite BM25 store")
+        self.path = Path(path)
+        self._conn = None
+        self.chunks = SqliteChunks(self)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection to the database, opened (and created) on first use"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+            # transactions are begun explicitly (_write), DDL included
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create()
+        return self._conn
+
+    def _create(self):
+        # not executescript: it would commit the open transaction
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+
+    def _write(self):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    @property
+    def ids(self) -> list:
+        """Chunk ids, in index order"""
+        return self.chunks.ids_of_kind(self.kind)
+
+    def iter_documents(self):
+        for i, text, metadata in self.conn.execute("SELECT id, text, metadata FROM chunks ORDER BY id"):
+            yield {"id": i, "text": text, "metadata": json.loads(metadata)}
+
+    def doc_ids(self) -> set:
+        return self.chunks.doc_ids(self.kind)
+
+    def delete_docs(self, doc_ids) -> int:
+        """Remove all chunks that belong to the given documents"""
+        rows = [
+            row for doc_id in set(doc_ids)
+            for row in self.conn.execute("SELECT id, text FROM chunks WHERE doc_id IS ?", (doc_id,))
+        ]
+        if not rows:
+            return 0
+
+        self._write()
+        # contentless table: a delete names the tokens the row was indexed with
+        self.conn.executemany(
+            "INSERT INTO bm25(bm25, rowid, tokens) VALUES ('delete', ?, ?)",
+            ((i, " ".join(bm25_tokenize(t))) for i, t in rows))
+        self.chunks.delete(i for i, _ in rows)
+        logger.info(f"Removed {len(rows)} documents from BM25")
+
+        return len(rows)
+
+    def reset(self):
+        # dropping the tables is much faster than deleting every row
+        self._write()
+        self.conn.execute("DROP TABLE bm25")
+        self.conn.execute("DROP TABLE chunks")
+        self._create()
+        self.chunks = SqliteChunks(self)
+
+    def add(self, texts: list[str], metadatas: list[dict]):
+        """:return: Chunk ids of the added documents"""
+        assert len(texts) == len(metadatas)
+
+        logger.info(f"Adding {len(texts)} documents to BM25")
+
+        self._write()
+        ids = self.chunks.add(texts, metadatas, self.kind)
+        self.conn.executemany(
+            "INSERT INTO bm25(rowid, tokens) VALUES (?, ?)",
+            ((i, " ".join(bm25_tokenize(t))) for i, t in zip(ids.tolist(), texts)))
+
+        logger.success(f"BM25 index updated: {len(ids)} documents added")
+        return ids
+
+    def search(self, query: str, top_k: int = 5, pruning: str | None = None):
+        """
+        :param pruning: Ignored, FTS5 picks the top_k itself (kept for the
+                        BM25Store.search signature)
+        """
+        tokens = dict.fromkeys(bm25_tokenize(query))
+        if not tokens:
+            return []
+
+        # bareword tokens could be FTS5 keywords (AND, OR, NOT, NEAR)
+        match = " OR ".join(f'"{t}"' for t in tokens)
+
+        # the join keeps rows without a chunk out of the LIMIT
+        rows = self.conn.execute(
+            "SELECT c.id, -bm25.rank, c.text, c.metadata FROM bm25 JOIN chunks c ON c.id = bm25.rowid"
+            " WHERE bm25 MATCH ? ORDER BY bm25.rank LIMIT ?",
+            (match, top_k)).fetchall()
+
+        return [
+            {
+                "id": chunk_id,
+                "score": float(score),
+                "norm_score": 0.0,
+                "source": "bm25",
+                "text": text,
+                "metadata": json.loads(metadata)}
+            for chunk_id, score, text, metadata in rows
+            if score > 0
+        ]
+
+    @staticmethod
+    def exists(path=config.paths["bm25_sqlite"]) -> bool:
+        return Path(path).is_file()
+
+    def save(self, path=None):
+        """Commit the changes since the last save (the database is always on disk)"""
+        if path is not None and Path(path) != self.path:
+            raise ValueError(f"SQLite BM25 store is opened at {self.path}, can not save to {path}")
+
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+        logger.success(f"BM25 saved to {self.path}")
+
+    def load(self, path=None):
+        """
+        Use the database at `path` (the one given to the constructor by
+        default). It is opened on the first query, nothing is read into
+        memory.
+        """
+        if path is not None and Path(path) != self.path:
+            if self._conn is not None:
+                self._conn.close()
+            self.path, self._conn = Path(path), None
+            self.chunks = SqliteChunks(self)
+
+        logger.success(f"BM25 opened at {self.path}")
+        return self
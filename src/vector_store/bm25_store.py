@@ -1,8 +1,10 @@
 import re
 import pickle
-from rank_bm25 import BM25Okapi
+from pathlib import Path
 from loguru import logger
 from config.config import Config
+from src.vector_store.bm25_index import BM25Index
+from src.vector_store.chunk_store import ChunkStore
 
 
 config = Config()
@@ -21,72 +23,165 @@ def bm25_tokenize(text: str):
     return [t for t in tokens if t not in STOPWORDS and len(t) > 2]
 
 
+def open_bm25_store(chunks: ChunkStore | None = None, backend: str = config.retrieval["bm25_backend"]):
+    """
+    BM25 store of the configured backend, not loaded yet.
+
+    :param backend: "index" - BM25Store (in-memory BM25Index, chunks in
+                    `chunks`), "sqlite" - SqliteBM25Store (FTS5 table and
+                    chunks on disk, `chunks` is not used)
+    """
+    if backend == "sqlite":
+        from src.vector_store.bm25_sqlite import SqliteBM25Store
+        return SqliteBM25Store()
+    if backend != "index":
+        raise ValueError(f"Unknown BM25 backend: {backend}")
+    return BM25Store(chunks)
+
+
+def _legacy_path(path) -> Path:
+    """Pickled index of the older format: the path itself or path.pkl"""
+    path = Path(path)
+    return path if path.suffix == ".pkl" else path.with_suffix(".pkl")
+
+
 class BM25Store:
-    def __init__(self):
+    """
+    BM25 over ChunkStore ids.
+
+    The inverted index (BM25Index) is keyed by the global chunk ids; texts
+    and metadata live in the chunk store. Adding chunks indexes only the new
+    ones. The index is saved as memory-mappable arrays and opened without
+    re-tokenizing the chunks.
+    """
+
+    kind = "bm25"
+
+    def __init__(self, chunks: ChunkStore | None = None):
         logger.info("Creating BM25 store")
-        self.documents = []   # [{text, metadata}]
-        self.bm25 = None
+        self.chunks = chunks if chunks is not None else ChunkStore()
+        self.index = BM25Index()
+        self._dirty = True          # changed since the last save / load
+
+    @property
+    def ids(self) -> list:
+        """Chunk ids, in index order"""
+        index = self.index
+        return index.doc_ids[:index.n_rows][index.alive[:index.n_rows]].tolist()
 
     def iter_documents(self):
-        return iter(self.documents)
+        return (self.chunks.get(i) for i in self.ids)
+
+    def doc_ids(self) -> set:
+        return self.chunks.doc_ids(self.kind)
+
+    def delete_docs(self, doc_ids) -> int:
+        """Remove all chunks that belong to the given documents"""
+        ids = self.chunks.ids_of_docs(set(doc_ids), self.kind)
+        if not ids:
+            return 0
+
+        self.index.delete(ids)
+        self.chunks.delete(ids)
+        self._dirty = True
+        logger.info(f"Removed {len(ids)} documents from BM25")
+
+        return len(ids)
+
+    def reset(self):
+        self.chunks.delete(self.chunks.ids_of_kind(self.kind))
+        self.index = BM25Index()
+        self._dirty = True
 
     def add(self, texts: list[str], metadatas: list[dict]):
+        """:return: Chunk ids of the added documents"""
         assert len(texts) == len(metadatas)
 
         logger.info(f"Adding {len(texts)} documents to BM25")
 
-        for text, meta in zip(texts, metadatas):
-            self.documents.append({
-                "text": text,
-                "metadata": meta
-            })
+        ids = self.chunks.add(texts, metadatas, self.kind)
+        self.index.add(ids, [bm25_tokenize(t) for t in texts])
+        self._dirty = True
 
-        tokenized = [bm25_tokenize(d["text"]) for d in self.documents]
-        self.bm25 = BM25Okapi(tokenized)
+        logger.success(f"BM25 index updated: {len(self.index)} documents")
+        return ids
 
-        logger.success("BM25 index built")
-
-    def search(self, query: str, top_k: int = 5):
-        if self.bm25 is None:
+    def search(self, query: str, top_k: int = 5, pruning: str = config.retrieval["bm25_pruning"]):
+        """
+        :param pruning: "maxscore" skips documents that can not reach the
+                        top_k, "none" scores all matching ones (same results)
+        """
+        if not len(self.index):
             logger.warning("BM25 index not built")
             return []
 
-        scores = self.bm25.get_scores(bm25_tokenize(query))
-
-        ranked = sorted(
-            enumerate(scores),
-            key=lambda x: x[1],
-            reverse=True
-        )[:top_k]
+        rows, scores = self.index.top_k(bm25_tokenize(query), top_k, pruning=pruning)
 
         results = []
-        for idx, score in ranked:
+        for row, score in zip(rows.tolist(), scores.tolist()):
             if score <= 0:
                 continue
 
-            doc = self.documents[idx]
+            chunk_id = int(self.index.doc_ids[row])
 
             results.append({
-                "id": doc["metadata"]["chunk_id"],
+                "id": chunk_id,
                 "score": float(score),
                 "norm_score": 0.0,
                 "source": "bm25",
-                "text": doc["text"],
-                "metadata": doc["metadata"]})
+                "text": self.chunks.text(chunk_id),
+                "metadata": self.chunks.metadata(chunk_id)})
 
         return results
 
+    @staticmethod
+    def exists(path=config.paths["bm25_index"]) -> bool:
+        """Whether an index was saved at `path` (in either format)"""
+        return BM25Index.exists(path) or _legacy_path(path).is_file()
+
     def save(self, path=config.paths["bm25_index"]):
-        with open(path, "wb") as f:
-            pickle.dump(self.documents, f)
+        if not self._dirty and BM25Index.exists(path):
+            return
+
+        self.index.save(path)
+        self._dirty = False
         logger.success(f"BM25 saved to {path}")
 
     def load(self, path=config.paths["bm25_index"]):
+        legacy = _legacy_path(path)
+        if not BM25Index.exists(path) and legacy.is_file():
+            self._load_pickle(legacy)
+        else:
+            try:
+                self.index = BM25Index.load(path)
+                self._dirty = False
+            except ValueError as e:
+                logger.warning(f"{e}, re-index with --full")
+                self.index = BM25Index()
+
+        # chunks deleted after this index was saved (crash between the
+        # checkpoint writes); the journal re-indexes their documents
+        ids = self.ids
+        dangling = [i for i, ok in zip(ids, self.chunks.alive(ids)) if not ok]
+        if dangling:
+            self.index.delete(dangling)
+            self._dirty = True
+
+        logger.success(f"BM25 loaded from {path}: {len(self.index)} documents")
+        return self
+
+    def _load_pickle(self, path):
+        """Index saved as a pickle (before the .npy format): rebuilt from the chunk texts"""
         with open(path, "rb") as f:
-            self.documents = pickle.load(f)
+            data = pickle.load(f)
 
-        tokenized = [bm25_tokenize(d["text"]) for d in self.documents]
-        self.bm25 = BM25Okapi(tokenized)
+        if isinstance(data, list):
+            # index written before the chunk store ([{text, metadata}])
+            logger.warning("BM25 index has no chunk ids, re-index with --full")
+            data = {"ids": []}
 
-        logger.success(f"BM25 loaded from {path}")
-        return self
+        ids = [i for i, ok in zip(data["ids"], self.chunks.alive(data["ids"])) if ok]
+
+        self.index = BM25Index()
+        self.index.add(ids, [bm25_tokenize(self.chunks.text(i)) for i in ids])
+        logger.info("Rebuilt BM25 from a pickled index, it is saved in the new format on the next save")
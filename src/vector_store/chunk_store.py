@@ -0,0 +1,288 @@
+import os
+import pickle
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+from loguru import logger
+from config.config import Config
+
+
+config = Config()
+
+
+class ChunkStore:
+    """
+    Text and metadata of every indexed chunk, shared by FaissStore and
+    BM25Store so each chunk is stored once.
+
+    Chunks are addressed by global int64 ids handed out in insertion order;
+    id -> text / metadata is a list index. FAISS keeps the ids in its
+    IndexIDMap, BM25 in its corpus order. Deleted ids leave a hole (None)
+    and are never reused, so an id held by a store can not silently point at
+    another chunk; a full rebuild (reset) starts from 0 again.
+
+    `kind` tells which index a chunk belongs to ("faiss" or "bm25", the
+    granularities differ).
+
+    save() writes only what changed since the last save, as a delta file
+    next to the pickle (`<path>.deltas/`); load replays the deltas over it.
+    Once the deltas add up to COMPACT_SHARE of the store, the next save
+    writes a new full pickle (the next generation) instead.
+    """
+
+    COMPACT_SHARE = 0.25
+
+    def __init__(self, path: str = config.paths["chunk_store"]):
+        self.path = Path(path)
+        self.texts: List[str | None] = []
+        self.metadatas: List[Dict | None] = []
+        self.kinds: List[str | None] = []
+        self.by_doc = defaultdict(list)     # doc_id -> ids, in insertion order
+
+        self.deltas_dir = self.path.with_suffix(".deltas")
+        self._generation = 0
+        self._seq = 0               # deltas written on top of the generation
+        self._delta_size = 0        # chunks they hold
+        self._saved_len = 0         # ids below were saved, the rest are new
+        self._changed = set()       # ids with new metadata since the last save
+        self._deleted = set()       # ids deleted since the last save
+        self._rewrite = True        # next save writes the full pickle
+
+        if self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(t is not None for t in self.texts)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def text(self, chunk_id: int) -> str:
+        return self.texts[chunk_id]
+
+    def metadata(self, chunk_id: int) -> Dict:
+        return self.metadatas[chunk_id]
+
+    def get(self, chunk_id: int) -> Dict:
+        return {
+            "id": int(chunk_id),
+            "text": self.texts[chunk_id],
+            "metadata": self.metadatas[chunk_id],
+        }
+
+    def alive(self, ids: Iterable[int]) -> List[bool]:
+        """Whether each id still points at a chunk"""
+        n = len(self.texts)
+        return [0 <= i < n and self.texts[i] is not None for i in ids]
+
+    def ids_of_docs(self, doc_ids: Iterable, kind: str | None = None) -> List[int]:
+        return [
+            i for doc_id in doc_ids for i in self.by_doc.get(doc_id, ())
+            if kind is None or self.kinds[i] == kind
+        ]
+
+    def ids_of_kind(self, kind: str) -> List[int]:
+        return [i for i, k in enumerate(self.kinds) if k == kind]
+
+    def doc_ids(self, kind: str | None = None) -> set:
+        if kind is None:
+            return set(self.by_doc)
+        return {
+            doc_id for doc_id, ids in self.by_doc.items()
+            if any(self.kinds[i] == kind for i in ids)
+        }
+
+    def iter_kind(
+        self, kind: str, skip_docs: Iterable = (), doc_ids: Iterable | None = None,
+    ) -> Iterator[tuple[int, str, Dict]]:
+        """(id, text, metadata) of the chunks of `kind` (of `doc_ids`, default: all), except those of `skip_docs`"""
+        skip_docs = set(skip_docs)
+        docs = self.by_doc if doc_ids is None else [d for d in doc_ids if d in self.by_doc]
+        for doc_id in docs:
+            if doc_id in skip_docs:
+                continue
+            for i in self.by_doc[doc_id]:
+                if self.kinds[i] == kind:
+                    yield i, self.texts[i], self.metadatas[i]
+
+    def ids_with_duplicates(self, doc_ids: Iterable | None = None) -> List[int]:
+        """Ids (of the given documents, default: all) with a non-empty "duplicates" list"""
+        ids = range(len(self.metadatas)) if doc_ids is None else self.ids_of_docs(doc_ids)
+        return [i for i in ids if self.metadatas[i] and self.metadatas[i].get("duplicates")]
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def add(self, texts: List[str], metadatas: List[Dict], kind: str) -> np.ndarray:
+        assert len(texts) == len(metadatas)
+
+        start = len(self.texts)
+        ids = np.arange(start, start + len(texts), dtype="int64")
+
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self.kinds.extend([kind] * len(texts))
+
+        for i, meta in zip(ids.tolist(), metadatas):
+            self.by_doc[meta.get("doc_id")].append(i)
+
+        return ids
+
+    def set_metadata(self, chunk_id: int, metadata: Dict):
+        self.metadatas[chunk_id] = metadata
+        self._changed.add(chunk_id)
+
+    def add_location(self, chunk_id: int, location: Dict):
+        """Append a near-duplicate's location to the chunk's "duplicates" list"""
+        self.metadatas[chunk_id].setdefault("duplicates", []).append(location)
+        self._changed.add(chunk_id)
+
+    def delete(self, ids: Iterable[int]):
+        ids = set(ids)
+        docs = set()
+
+        for i in ids:
+            docs.add(self.metadatas[i].get("doc_id"))
+            self.texts[i] = None
+            self.metadatas[i] = None
+            self.kinds[i] = None
+
+        self._deleted |= ids
+        for doc_id in docs:
+            left = [i for i in self.by_doc[doc_id] if i not in ids]
+            if left:
+                self.by_doc[doc_id] = left
+            else:
+                del self.by_doc[doc_id]
+
+    def reset(self):
+        self.texts, self.metadatas, self.kinds = [], [], []
+        self.by_doc.clear()
+        self._rewrite = True
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self):
+        """Write the changes since the last save: a delta, or the full pickle"""
+        # ids added since are written whole, deleted or not
+        new = len(self.texts) - self._saved_len
+        deleted = {i for i in self._deleted if i < self._saved_len}
+        changed = {i for i in self._changed if i < self._saved_len} - deleted
+        size = new + len(changed) + len(deleted)
+
+        if self._rewrite or self._delta_size + size > self.COMPACT_SHARE * len(self.texts):
+            self._save_full()
+        elif size:
+            self._save_delta(changed, deleted)
+        else:
+            return
+
+        self._saved_len = len(self.texts)
+        self._changed.clear()
+        self._deleted.clear()
+        self._rewrite = False
+
+    def _save_full(self):
+        self._generation += 1
+        self._seq = self._delta_size = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "generation": self._generation,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+                "kinds": self.kinds,
+            }, f)
+        os.replace(tmp, self.path)
+
+        # deltas of the generation before stay, for a reader that loaded
+        # its pickle just before this one replaced it
+        for delta in self._deltas():
+            if int(delta.name.split("-")[0]) != self._generation - 1:
+                delta.unlink(missing_ok=True)
+
+        logger.success(f"Chunk store saved: {len(self)} chunks")
+
+    def _save_delta(self, changed: set, deleted: set):
+        start = self._saved_len
+        self._seq += 1
+        self._delta_size += len(self.texts) - start + len(changed) + len(deleted)
+
+        self.deltas_dir.mkdir(parents=True, exist_ok=True)
+        path = self.deltas_dir / f"{self._generation:06d}-{self._seq:06d}.pkl"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "start": start,
+                "texts": self.texts[start:],
+                "metadatas": self.metadatas[start:],
+                "kinds": self.kinds[start:],
+                "changed": {i: self.metadatas[i] for i in changed},
+                "deleted": sorted(deleted),
+            }, f)
+        os.replace(tmp, path)
+
+        logger.success(
+            f"Chunk store saved: {len(self.texts) - start} new, {len(changed)} changed, "
+            f"{len(deleted)} deleted chunks")
+
+    def _deltas(self) -> List[Path]:
+        if not self.deltas_dir.is_dir():
+            return []
+        return sorted(self.deltas_dir.glob("*.pkl"))
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            data = pickle.load(f)
+
+        self.texts = data["texts"]
+        self.metadatas = data["metadatas"]
+        self.kinds = data["kinds"]
+        self._generation = data.get("generation", 0)
+        self._seq = self._delta_size = 0
+
+        prefix = f"{self._generation:06d}-"
+        for path in self._deltas():
+            if path.name.startswith(prefix):
+                self._apply_delta(path)
+
+        self.by_doc.clear()
+        for i, meta in enumerate(self.metadatas):
+            if meta is not None:
+                self.by_doc[meta.get("doc_id")].append(i)
+
+        self._saved_len = len(self.texts)
+        self._changed.clear()
+        self._deleted.clear()
+        self._rewrite = False
+
+        logger.success(f"Chunk store loaded: {len(self)} chunks")
+        return self
+
+    def _apply_delta(self, path: Path):
+        with open(path, "rb") as f:
+            delta = pickle.load(f)
+
+        start = delta["start"]
+        for values, new in (
+                (self.texts, delta["texts"]),
+                (self.metadatas, delta["metadatas"]),
+                (self.kinds, delta["kinds"])):
+            del values[start:]
+            values.extend(new)
+
+        for i, meta in delta["changed"].items():
+            self.metadatas[i] = meta
+        for i in delta["deleted"]:
+            self.texts[i] = self.metadatas[i] = self.kinds[i] = None
+
+        self._seq = int(path.stem.split("-")[1])
+        self._delta_size += len(delta["texts"]) + len(delta["changed"]) + len(delta["deleted"])
@@ -1,50 +1,73 @@
 from pathlib import Path
-import pickle
-from typing import List, Dict
+import os
 
 import faiss
 import numpy as np
 from loguru import logger
 
+from src.vector_store.chunk_store import ChunkStore
+
 
 class FaissStore:
-    def __init__(self, dim: int, index_dir="data/faiss", normalize=True):
+    """
+    Dense index over ChunkStore ids.
+
+    The FAISS index is an IndexIDMap2 keyed by the global chunk ids, so a
+    search hit resolves to the same id BM25 uses for that chunk store and
+    deletes do not shift anything. Texts and metadata live in the chunk
+    store only.
+    """
+
+    kind = "faiss"
+
+    def __init__(self, dim: int, index_dir="data/faiss", normalize=True, chunks: ChunkStore | None = None):
         self.dim = dim
         self.normalize = normalize
+        self.chunks = chunks if chunks is not None else ChunkStore()
 
         self.index_dir = Path(index_dir)
         self.index_file = self.index_dir / "index.faiss"
-        self.meta_file = self.index_dir / "meta.pkl"
 
         self.index = None
-        self.ids: List[str] = []
-        self.texts: List[str] = []
-        self.metadatas: List[Dict] = []
+        self._dirty = False         # changed since the last save / load
 
         self.index_dir.mkdir(parents=True, exist_ok=True)
 
-        if self.index_file.exists() and self.meta_file.exists():
+        if self.index_file.exists():
             self._load()
         else:
             self._create_new()
 
     def _create_new(self):
         logger.info("Creating new FAISS index")
-        self.index = faiss.IndexFlatIP(self.dim)
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+        self._dirty = True
+
+    def reset(self):
+        """Drop all vectors (full rebuild)"""
+        self._create_new()
+        self.chunks.delete(self.chunks.ids_of_kind(self.kind))
 
     def _load(self):
         logger.info("Loading FAISS index from disk")
 
-        self.index = faiss.read_index(str(self.index_file))
+        index = faiss.read_index(str(self.index_file))
 
-        with open(self.meta_file, "rb") as f:
-            data = pickle.load(f)
+        if not isinstance(index, faiss.IndexIDMap2):
+            # index written before the chunk store (positions, meta.pkl)
+            logger.warning("FAISS index has no chunk ids, re-index with --full")
+            self._create_new()
+            return
 
-        self.ids = data["ids"]
-        self.texts = data["texts"]
-        self.metadatas = data["metadatas"]
+        self.index = index
 
-        assert self.index.ntotal == len(self.ids)
+        # ids of chunks deleted after this index was saved (crash between
+        # the checkpoint writes); the journal re-indexes their documents
+        ids = faiss.vector_to_array(self.index.id_map)
+        dangling = ids[~np.array(self.chunks.alive(ids.tolist()), dtype=bool)]
+        if len(dangling):
+            self.index.remove_ids(dangling)
+            self._dirty = True
 
         logger.success(f"FAISS loaded: {self.index.ntotal} vectors")
 
@@ -53,19 +76,41 @@ class FaissStore:
             return x
         return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-10)
 
-    def add(self, ids, embeddings, texts, metadatas):
-        assert len(ids) == len(texts) == len(metadatas)
+    def add(self, embeddings, texts, metadatas) -> np.ndarray:
+        """:return: Chunk ids of the added vectors"""
+        assert len(embeddings) == len(texts) == len(metadatas)
 
         embeddings = np.array(embeddings, dtype="float32")
         embeddings = self._normalize(embeddings)
 
-        self.index.add(embeddings)
-
-        self.ids.extend(ids)
-        self.texts.extend(texts)
-        self.metadatas.extend(metadatas)
+        ids = self.chunks.add(texts, metadatas, self.kind)
+        self.index.add_with_ids(embeddings, ids)
+        self._dirty = True
 
         logger.info(f"Added {len(ids)} vectors (total={self.index.ntotal})")
+        return ids
+
+    def doc_ids(self) -> set:
+        return self.chunks.doc_ids(self.kind)
+
+    def delete_docs(self, doc_ids) -> int:
+        """
+        Remove all vectors that belong to the given documents.
+
+        :param doc_ids: Iterable of doc_id
+        :return: Number of removed vectors
+        :rtype: int
+        """
+        ids = self.chunks.ids_of_docs(set(doc_ids), self.kind)
+        if not ids:
+            return 0
+
+        self.index.remove_ids(np.array(ids, dtype="int64"))
+        self.chunks.delete(ids)
+        self._dirty = True
+
+        logger.info(f"Removed {len(ids)} vectors (total={self.index.ntotal})")
+        return len(ids)
 
     def search(self, query_embedding, top_k=5):
         if self.index.ntotal == 0:
@@ -74,32 +119,31 @@ class FaissStore:
         q = np.array(query_embedding, dtype="float32").reshape(1, -1)
         q = self._normalize(q)
 
-        scores, indices = self.index.search(q, top_k)
+        scores, ids = self.index.search(q, top_k)
 
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx == -1:
+        for score, chunk_id in zip(scores[0], ids[0]):
+            if chunk_id == -1:
                 continue
-           
-            meta = self.metadatas[idx]
 
             results.append({
-                "id": meta["chunk_id"],          # 🔑 ВСЕГДА id
+                "id": int(chunk_id),          # global chunk id, shared with BM25
                 "score": float(score),
                 "norm_score": 0.0,         # заполним позже
                 "source": "faiss",
-                "text": self.texts[idx],
-                "metadata": meta})
+                "text": self.chunks.text(chunk_id),
+                "metadata": self.chunks.metadata(chunk_id)})
 
         return results
 
     def save(self):
-        faiss.write_index(self.index, str(self.index_file))
-        with open(self.meta_file, "wb") as f:
-            pickle.dump({
-                "ids": self.ids,
-                "texts": self.texts,
-                "metadatas": self.metadatas,
-            }, f)
+        if not self._dirty and self.index_file.exists():
+            return
+
+        # write to a temp file and rename, so a crash never leaves a torn file
+        index_tmp = self.index_file.with_suffix(".tmp")
+        faiss.write_index(self.index, str(index_tmp))
+        os.replace(index_tmp, self.index_file)
+        self._dirty = False
 
         logger.success(f"FAISS saved: {self.index.ntotal}")